@@ -4,4 +4,6 @@ from .dbmodels import *
 from .localserver import LocalServer
 from .memorystorage import MemoryStorage
 from .palworldsettings import PalWorldSettings
+from .playerregistry import PlayerRecord, PlayerRegistry
+from .commandhistory import CommandRecord, CommandHistory
 from .discord_client import DiscordClient
@@ -0,0 +1,156 @@
+"""This file contains the classes CommandRecord and CommandHistory"""
+
+import collections
+import itertools
+import threading
+from datetime import datetime
+
+
+class CommandRecord:
+    """One RCON command sent by an admin, and its response."""
+
+    FIELDS = (
+        "timestamp",
+        "source",
+        "command",
+        "response",
+        "duration",
+        "success",
+    )
+
+    __slots__ = FIELDS + ("id",)
+
+    def __init__(
+        self,
+        record_id: int,
+        source: str,
+        command: str,
+        response: str,
+        duration: float,
+    ):
+        """
+        Initialize a CommandRecord object.
+
+        Args:
+            record_id (int): The position of the record in the history.
+            source (str): Where the command came from, like "admin",
+                "discord" or "enforcement".
+            command (str): The command that was sent.
+            response (str): The response of the server, or the error.
+            duration (float): Seconds from sending the command to its
+                response.
+        """
+        self.id = record_id
+        self.timestamp = datetime.now()
+        self.source = source
+        self.command = command
+        self.response = response
+        self.duration = duration
+        self.success = not (
+            response.startswith("Failed to execute command")
+            or "Unknown command" in response
+        )
+
+    def to_dict(self) -> dict:
+        """Return the fields of the record as a dict."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def to_json(self) -> dict:
+        """Return the record as a dict that can be sent to the frontend."""
+        record = self.to_dict()
+        record["id"] = self.id
+        record["timestamp"] = self.timestamp.isoformat(timespec="seconds")
+        record["duration"] = round(self.duration, 4)
+        return record
+
+
+class CommandHistory:
+    """The last RCON commands sent by admins, newest last.
+
+    A bounded ring buffer, so recording a command never grows memory. The
+    records that weren't written to the database yet are kept apart, so
+    the database flush writes them in one batch.
+    """
+
+    def __init__(self, size: int = 500):
+        """
+        Initialize a CommandHistory object.
+
+        Args:
+            size (int): The number of records kept in memory.
+        """
+        self.lock = threading.Lock()
+        self.records: collections.deque = collections.deque(maxlen=size)
+        # Fields of the records waiting to be written to the database
+        self.unsaved: collections.deque = collections.deque(maxlen=size)
+        self.ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(
+        self, source: str, command: str, response: str, duration: float
+    ) -> CommandRecord:
+        """Add a command and its response, see CommandRecord."""
+        with self.lock:
+            record = CommandRecord(
+                next(self.ids), source, command, response, duration
+            )
+            self.records.append(record)
+            self.unsaved.append(record.to_dict())
+        return record
+
+    def page(
+        self, page: int = 1, per_page: int = 20, source: str = None
+    ) -> dict:
+        """
+        Return one page of the history, newest first.
+
+        Args:
+            page (int): The page number, starting at 1.
+            per_page (int): The number of records on a page.
+            source (str, optional): Only include records from this source.
+
+        Returns:
+            dict: The records of the page, as dicts, and the paging info.
+        """
+        page = max(1, int(page))
+        per_page = max(1, min(100, int(per_page)))
+        with self.lock:
+            records = [
+                record
+                for record in reversed(self.records)
+                if source is None or record.source == source
+            ]
+        start = (page - 1) * per_page
+        return {
+            "page": page,
+            "per_page": per_page,
+            "pages": max(1, -(-len(records) // per_page)),
+            "total": len(records),
+            "records": [
+                record.to_json()
+                for record in records[start : start + per_page]
+            ],
+        }
+
+    def take_unsaved(self) -> list:
+        """
+        Return the records that weren't written to the database, as dicts.
+
+        Pass the result to mark_unsaved if writing them fails.
+        """
+        with self.lock:
+            unsaved = list(self.unsaved)
+            self.unsaved.clear()
+        return unsaved
+
+    def mark_unsaved(self, records: list) -> None:
+        """Queue records from take_unsaved to be written again."""
+        with self.lock:
+            # They are older than anything recorded since, so they go
+            # first, and are dropped first if the database stays down
+            pending = list(self.unsaved)
+            self.unsaved.clear()
+            self.unsaved.extend(records)
+            self.unsaved.extend(pending)
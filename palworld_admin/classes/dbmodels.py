@@ -79,6 +79,8 @@ class Connection(db.Model):
     host = db.Column(db.String(255))
     port = db.Column(db.Integer)
     password = db.Column(db.String(255))
+    # Whether the server is part of the monitored cluster
+    monitored = db.Column(db.Boolean, default=False)
 
 
 class Players(db.Model):
@@ -98,3 +100,15 @@ class Players(db.Model):
     whitelisted_ip = db.Column(db.String(255))
     banned = db.Column(db.Boolean, default=False)
     is_admin = db.Column(db.Boolean, default=False)
+
+
+class RconCommandLog(db.Model):
+    """RCON commands sent by admins, for the command history."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    timestamp = db.Column(db.DateTime, index=True)
+    source = db.Column(db.String(32))
+    command = db.Column(db.Text)
+    response = db.Column(db.Text)
+    duration = db.Column(db.Float)
+    success = db.Column(db.Boolean, default=True)
@@ -3,6 +3,9 @@
 import datetime
 import subprocess
 
+from .commandhistory import CommandHistory
+from .playerregistry import PlayerRegistry
+
 
 class LocalServer:
     """This class is used to store the paths of the local server."""
@@ -24,7 +27,7 @@ class LocalServer:
         self.server_process: subprocess.Popen = None
         self.online_players: list = []
         self.last_online_players: list = []
-        self.all_players: list = []
+        self.all_players: PlayerRegistry = PlayerRegistry()
 
         # RCON Variables
         self.rcon_last_connection_args: dict = {}
@@ -32,11 +35,21 @@ class LocalServer:
         self.connected: bool = False
         self.launch_rcon_on_startup: bool = False
         self.rcon_monitoring_interval = 2
+        # Poll faster for a while after players join or leave
+        self.rcon_monitoring_active_interval = 1
+        self.rcon_monitoring_active_duration = 10
+        # Poll slower once the server has been empty for a while
+        self.rcon_monitoring_idle_interval = 15
+        self.rcon_monitoring_idle_after = 60
+        # Resend an unchanged player list this often, for newly opened pages
+        self.rcon_monitoring_resend_interval = 30
         self.rcon_monitoring_connection_error_count = 0
         self.ip: str = ""
         self.port: int = 0
         self.password: str = ""
         self.rcon_player_count: int = 0
+        # The last admin commands and their responses
+        self.command_history: CommandHistory = CommandHistory()
 
         ##### Server Manager Variables #####
         self.steamcmd_installed: bool = False
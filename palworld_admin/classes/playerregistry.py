@@ -0,0 +1,169 @@
+"""This file contains the classes PlayerRecord and PlayerRegistry"""
+
+import threading
+from typing import Iterator, Optional
+
+
+class PlayerRecord:
+    """One known player, with the fields of the Players table."""
+
+    FIELDS = (
+        "steam_id",
+        "steam_authenticated",
+        "steam_auth_ip",
+        "online",
+        "name",
+        "player_id",
+        "save_id",
+        "first_login",
+        "last_seen",
+        "whitelisted",
+        "whitelisted_ip",
+        "banned",
+        "is_admin",
+    )
+
+    __slots__ = FIELDS + ("dirty",)
+
+    def __init__(self, steam_id: str, **fields):
+        """
+        Initialize a PlayerRecord object.
+
+        Args:
+            steam_id (str): The SteamID of the player.
+            **fields: Values for any of the other fields in FIELDS.
+        """
+        self.steam_id = steam_id
+        self.steam_authenticated = False
+        self.steam_auth_ip = ""
+        self.online = False
+        self.name = None
+        self.player_id = None
+        self.save_id = None
+        self.first_login = None
+        self.last_seen = None
+        self.whitelisted = False
+        self.whitelisted_ip = ""
+        self.banned = False
+        self.is_admin = False
+        for field, value in fields.items():
+            setattr(self, field, value)
+        # Whether the record changed since it was last written to the database
+        self.dirty = True
+
+    def to_dict(self) -> dict:
+        """Return the fields of the player as a dict."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class PlayerRegistry:
+    """Every known player, indexed by SteamID.
+
+    Mutations go through the registry so they are thread safe and mark the
+    changed records dirty, which lets the database flush write only the
+    players that changed.
+    """
+
+    def __init__(self, players: list = None):
+        """
+        Initialize a PlayerRegistry object.
+
+        Args:
+            players (list, optional): Player dicts loaded from the database.
+                They start out clean.
+        """
+        self.lock = threading.RLock()
+        self.players: dict[str, PlayerRecord] = {}
+        # SteamIDs of the players that are online
+        self.online: set[str] = set()
+        for player in players or []:
+            if not player.get("steam_id"):
+                continue
+            record = PlayerRecord(**player)
+            record.dirty = False
+            self.players[record.steam_id] = record
+            if record.online:
+                self.online.add(record.steam_id)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __contains__(self, steam_id: str) -> bool:
+        return steam_id in self.players
+
+    def __iter__(self) -> Iterator[PlayerRecord]:
+        with self.lock:
+            return iter(list(self.players.values()))
+
+    def get(self, steam_id: str) -> Optional[PlayerRecord]:
+        """Return the player with the given SteamID, or None."""
+        return self.players.get(steam_id)
+
+    def update(
+        self, steam_id: str, create: bool = False, **fields
+    ) -> Optional[PlayerRecord]:
+        """
+        Change the fields of a player, marking it dirty if anything changed.
+
+        Args:
+            steam_id (str): The SteamID of the player.
+            create (bool): Add the player if it isn't known yet.
+            **fields: The new values of the fields.
+
+        Returns:
+            PlayerRecord: The player, or None if it isn't known and create
+                is False.
+        """
+        with self.lock:
+            record = self.players.get(steam_id)
+            if record is None:
+                if not create:
+                    return None
+                record = PlayerRecord(steam_id, **fields)
+                self.players[steam_id] = record
+            else:
+                for field, value in fields.items():
+                    if getattr(record, field) != value:
+                        setattr(record, field, value)
+                        record.dirty = True
+            if record.online:
+                self.online.add(steam_id)
+            else:
+                self.online.discard(steam_id)
+            return record
+
+    def touch_online(self, now) -> None:
+        """Set the last_seen time of every online player."""
+        with self.lock:
+            for steam_id in self.online:
+                record = self.players[steam_id]
+                record.last_seen = now
+                record.dirty = True
+
+    def take_dirty(self) -> list:
+        """
+        Return the players that changed since the last call, as dicts.
+
+        Their records are marked clean. Pass the result to mark_dirty if
+        writing them fails.
+        """
+        with self.lock:
+            dirty = []
+            for record in self.players.values():
+                if record.dirty:
+                    dirty.append(record.to_dict())
+                    record.dirty = False
+            return dirty
+
+    def mark_dirty(self, players: list) -> None:
+        """Mark players from take_dirty as changed again."""
+        with self.lock:
+            for player in players:
+                record = self.players.get(player["steam_id"])
+                if record is not None:
+                    record.dirty = True
+
+    def to_list(self) -> list:
+        """Return every player as a dict."""
+        with self.lock:
+            return [record.to_dict() for record in self.players.values()]
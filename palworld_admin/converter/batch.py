@@ -0,0 +1,120 @@
+"""Parallel decoding of the per-player .sav files of a world."""
+
+import glob
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Iterator, Optional
+
+from palworld_admin.converter.lib.gvas import GvasFile
+from palworld_admin.converter.lib.noindent import CustomEncoder
+from palworld_admin.converter.lib.palsav import decompress_sav_to_gvas
+from palworld_admin.converter.lib.paltypes import (
+    PALWORLD_CUSTOM_PROPERTIES,
+    PALWORLD_TYPE_HINTS,
+)
+
+
+def player_save_paths(path: str) -> list[str]:
+    """
+    Return the player saves of a world.
+
+    Args:
+        path (str): Either the world directory or its Players directory.
+
+    Returns:
+        list: The paths of every Players/*.sav file, sorted, or an empty
+            list if path is neither.
+    """
+    players_dir = os.path.join(path, "Players")
+    if not os.path.isdir(players_dir):
+        # Never pick up Level.sav and the other saves of the world itself
+        if os.path.basename(os.path.normpath(path)) != "Players":
+            return []
+        players_dir = path
+    return sorted(glob.glob(os.path.join(players_dir, "*.sav")))
+
+
+def run_batch(
+    func: Callable[[str], Any],
+    paths: list[str],
+    workers: int = None,
+    mp_context=None,
+) -> Iterator[tuple[str, Any, Optional[str]]]:
+    """
+    Run func over every path on a process pool, yielding results as they finish.
+
+    Args:
+        func (callable): A picklable, module level function taking a path.
+        paths (list): The files to process.
+        workers (int, optional): The pool size. Defaults to the CPU count,
+            and 1 runs everything in the current process.
+        mp_context (optional): The multiprocessing context of the pool.
+            Defaults to spawn, the only start method on Windows, so the
+            workers start the same way on every platform and never fork
+            the threads of the web app.
+
+    Yields:
+        tuple: The path, the result of func and an error message if it failed.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                yield path, func(path), None
+            except Exception as e:  # pylint: disable=broad-except
+                yield path, None, f"{type(e).__name__}: {e}"
+        return
+
+    mp_context = mp_context or multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths)), mp_context=mp_context
+    ) as pool:
+        futures = {pool.submit(func, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:  # pylint: disable=broad-except
+                yield futures[future], None, f"{type(e).__name__}: {e}"
+
+
+def player_save_json(path: str) -> str:
+    """Decompress and parse a player save, returning it as one JSON line."""
+    with open(path, "rb") as f:
+        raw_gvas, _ = decompress_sav_to_gvas(f.read())
+    gvas_file = GvasFile.read(
+        raw_gvas, PALWORLD_TYPE_HINTS, PALWORLD_CUSTOM_PROPERTIES
+    )
+    return json.dumps(
+        {"path": path, "save": gvas_file.dump()}, cls=CustomEncoder
+    )
+
+
+def convert_players_to_jsonl(
+    paths: list[str], output, workers: int = None, progress=None
+) -> list[tuple[str, str]]:
+    """
+    Convert player saves in parallel, streaming one JSON line per save to output.
+
+    Args:
+        paths (list): The player saves to convert.
+        output: A writable text file.
+        workers (int, optional): The process pool size.
+        progress (callable, optional): Called with the number of finished
+            saves, the total and the path of the save that just finished.
+
+    Returns:
+        list: The path and error message of every save that failed.
+    """
+    errors = []
+    for done, (path, line, error) in enumerate(
+        run_batch(player_save_json, paths, workers), start=1
+    ):
+        if error:
+            errors.append((path, error))
+        else:
+            output.write(line + "\n")
+        if progress:
+            progress(done, len(paths), path)
+    return errors
@@ -1,7 +1,16 @@
+import logging
+import struct
 from typing import Any, Sequence
 
 from palworld_admin.converter.lib.archive import *
 
+# Static id prefixes whose serialised layout is known up front
+STATIC_ID_PREFIX_LAYOUTS: tuple[tuple[str, str], ...] = (("PalEgg_", "egg"),)
+
+# Layout resolved for each static_id seen so far, so that every subsequent
+# item with the same static_id decodes along a single path
+_layout_cache: dict[str, str] = {}
+
 
 def decode(
     reader: FArchiveReader, type_name: str, size: int, path: str
@@ -25,52 +34,120 @@ def decode_bytes(c_bytes: Sequence[int]) -> dict[str, Any]:
         "local_id_in_created_world": reader.guid(),
         "static_id": reader.fstring(),
     }
-    data["type"] = "unknown"
-    egg_data = try_read_egg(reader)
-    if egg_data != None:
-        data |= egg_data
-    elif (reader.size - reader.data.tell()) == 4:
-        data["type"] = "armor"
-        data["durability"] = reader.float()
-        if not reader.eof():
-            raise Exception("Warning: EOF not reached")
-    else:
-        cur_pos = reader.data.tell()
-        temp_data = {"type": "weapon"}
+    static_id = data["id"]["static_id"]
+    cur_pos = reader.data.tell()
+    # Normally only the first candidate is decoded; the next one is tried
+    # only when the bytes happen to fit more than one layout
+    error = None
+    for layout in candidate_layouts(static_id, buf, cur_pos):
         try:
-            temp_data["durability"] = reader.float()
-            temp_data["remaining_bullets"] = reader.i32()
-            temp_data["passive_skill_list"] = reader.tarray(
-                lambda r: r.fstring()
-            )
-            if not reader.eof():
-                raise Exception("Warning: EOF not reached")
-            data |= temp_data
+            layout_data = read_layout(reader, layout)
         except Exception as e:
-            print(
-                f"Warning: Failed to parse weapon data, continuing as raw data {buf}: {e}"
-            )
+            error = e
             reader.data.seek(cur_pos)
-            data["trailer"] = [int(b) for b in reader.read_to_end()]
+            continue
+        _layout_cache[static_id] = layout
+        return data | {"type": layout} | layout_data
+    if error is not None:
+        logging.warning(
+            "Failed to parse dynamic item data, continuing as raw data %s: %s",
+            buf,
+            error,
+        )
+        _layout_cache.pop(static_id, None)
+    data["type"] = "unknown"
+    data["trailer"] = [int(b) for b in reader.read_to_end()]
     return data
 
 
-def try_read_egg(reader: FArchiveReader) -> Optional[dict[str, Any]]:
-    cur_pos = reader.data.tell()
-    try:
-        data = {"type": "egg"}
-        data["character_id"] = reader.fstring()
-        data["object"] = reader.properties_until_end()
-        data["unknown_bytes"] = reader.byte_list(4)
-        data["unknown_id"] = reader.guid()
-        if not reader.eof():
-            raise Exception("Warning: EOF not reached")
-        return data
-    except Exception as e:
-        if e.args[0] == "Warning: EOF not reached":
-            raise e
-        reader.data.seek(cur_pos)
-        return None
+# The order the layouts were tried in before the classifier
+LAYOUT_ORDER = ("egg", "armor", "weapon")
+
+
+def candidate_layouts(static_id: str, buf: bytes, pos: int) -> list[str]:
+    candidates = []
+    cached = _layout_cache.get(static_id)
+    if cached is not None:
+        candidates.append(cached)
+    for prefix, layout in STATIC_ID_PREFIX_LAYOUTS:
+        if static_id.startswith(prefix):
+            candidates.append(layout)
+    candidates.extend(LAYOUT_ORDER)
+    return [
+        layout
+        for index, layout in enumerate(candidates)
+        if layout not in candidates[:index] and layout_fits(layout, buf, pos)
+    ]
+
+
+def read_layout(reader: FArchiveReader, layout: str) -> dict[str, Any]:
+    if layout == "egg":
+        data = read_egg(reader)
+    elif layout == "armor":
+        data = {"durability": reader.float()}
+    else:
+        data = {
+            "durability": reader.float(),
+            "remaining_bullets": reader.i32(),
+            "passive_skill_list": reader.tarray(lambda r: r.fstring()),
+        }
+    if not reader.eof():
+        raise Exception("Warning: EOF not reached")
+    return data
+
+
+def layout_fits(layout: str, buf: bytes, pos: int) -> bool:
+    remaining = len(buf) - pos
+    if layout == "armor":
+        return remaining == 4
+    if layout == "weapon":
+        # durability, remaining_bullets and the passive skill count
+        if remaining < 12:
+            return False
+        (count,) = struct.unpack_from("<I", buf, pos + 8)
+        pos += 12
+        if count > (len(buf) - pos) // 4:
+            return False
+        for _ in range(count):
+            pos = skip_fstring(buf, pos)
+            if pos < 0:
+                return False
+        return pos == len(buf)
+    if layout == "egg":
+        # character_id, at least a "None" property terminator,
+        # unknown_bytes and unknown_id
+        pos = skip_fstring(buf, pos)
+        return pos >= 0 and len(buf) - pos >= 9 + 4 + 16
+    return layout == "unknown"
+
+
+def skip_fstring(buf: bytes, pos: int) -> int:
+    if len(buf) - pos < 4:
+        return -1
+    (size,) = struct.unpack_from("<i", buf, pos)
+    pos += 4
+    if size == 0:
+        return pos
+    if size < 0:
+        if size == -2147483648:
+            return -1
+        size = -size * 2
+        terminator = b"\x00\x00"
+    else:
+        terminator = b"\x00"
+    end = pos + size
+    if end > len(buf) or buf[end - len(terminator) : end] != terminator:
+        return -1
+    return end
+
+
+def read_egg(reader: FArchiveReader) -> dict[str, Any]:
+    data = {}
+    data["character_id"] = reader.fstring()
+    data["object"] = reader.properties_until_end()
+    data["unknown_bytes"] = reader.byte_list(4)
+    data["unknown_id"] = reader.guid()
+    return data
 
 
 def encode(
@@ -0,0 +1,255 @@
+"""Disk-backed decoding for the largest sections of Level.sav.
+
+MapObjectSaveData and FoliageGridSaveDataMap hold most of a world's entries.
+Decoding them with a SpillSession streams each entry into a temporary record
+file as soon as it is parsed, so only its offset stays in memory.
+"""
+
+import bisect
+import hashlib
+import json
+import pickle
+import tempfile
+from array import array
+from typing import Any, Callable, Iterator, Optional
+
+from palworld_admin.converter.lib.archive import FArchiveReader, FArchiveWriter
+from palworld_admin.converter.lib.paltypes import PALWORLD_CUSTOM_PROPERTIES
+
+SPILL_KEYS: dict[str, Callable[[Any], Any]] = {
+    ".worldSaveData.MapObjectSaveData": lambda entry: entry[
+        "MapObjectInstanceId"
+    ]["value"],
+    ".worldSaveData.FoliageGridSaveDataMap": lambda entry: entry["key"],
+}
+
+
+def key_hash(key: Any) -> int:
+    """Return a stable 64 bit hash of a GUID, name or struct key."""
+    if isinstance(key, (dict, list)):
+        key = json.dumps(key, sort_keys=True, default=str)
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SpillStore:
+    """Append-only record file of pickled entries.
+
+    Only the offset and key hash of each entry are kept in memory. The store
+    behaves like a read-only list, so the archive writer can encode it like
+    the list it replaces.
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        key: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+        Initialize a SpillStore object.
+
+        Args:
+            directory (str, optional): Where to create the record file.
+                Defaults to the system temporary directory.
+            key (callable, optional): Returns the lookup key of an entry.
+        """
+        self.file = tempfile.TemporaryFile(
+            prefix="palworld-admin-spill-", dir=directory
+        )
+        self.key = key
+        self.offsets = array("Q", [0])
+        self.hashes = array("Q")
+        self.sorted_hashes: Optional[array] = None
+        self.sorted_indexes: Optional[array] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """Close and delete the record file."""
+        self.file.close()
+
+    def append(self, entry: Any) -> None:
+        """Write an entry to the end of the record file."""
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        self.file.seek(self.offsets[-1])
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        if self.key is not None:
+            self.hashes.append(key_hash(self.key(entry)))
+            self.sorted_hashes = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("spill store index out of range")
+        start = self.offsets[index]
+        self.file.seek(start)
+        return pickle.loads(self.file.read(self.offsets[index + 1] - start))
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """
+        Look up an entry by its key.
+
+        Args:
+            key: The key to look for, as returned by the store's key function.
+            default: Returned when no entry has that key.
+
+        Returns:
+            The first entry with that key, or default.
+        """
+        if self.key is None:
+            raise TypeError("spill store has no key function")
+        if self.sorted_hashes is None:
+            order = sorted(
+                range(len(self.hashes)), key=self.hashes.__getitem__
+            )
+            self.sorted_indexes = array("Q", order)
+            self.sorted_hashes = array("Q", (self.hashes[i] for i in order))
+        wanted = key_hash(key)
+        position = bisect.bisect_left(self.sorted_hashes, wanted)
+        while (
+            position < len(self.sorted_hashes)
+            and self.sorted_hashes[position] == wanted
+        ):
+            entry = self[self.sorted_indexes[position]]
+            if key_hash(self.key(entry)) == wanted and self.key(entry) == key:
+                return entry
+            position += 1
+        return default
+
+
+class SpillSession:
+    """Custom property decoders that spill the largest sections to disk.
+
+    Pass custom_properties to GvasFile.read instead of
+    PALWORLD_CUSTOM_PROPERTIES. The returned GvasFile can still be written
+    back with the same custom properties until the session is closed.
+    """
+
+    def __init__(self, directory: str = None, keys: dict = None):
+        """
+        Initialize a SpillSession object.
+
+        Args:
+            directory (str, optional): Where to create the record files.
+            keys (dict, optional): Lookup key functions by property path.
+                Defaults to SPILL_KEYS.
+        """
+        self.directory = directory
+        self.keys = SPILL_KEYS if keys is None else keys
+        self.stores: dict[str, SpillStore] = {}
+        self.custom_properties = dict(PALWORLD_CUSTOM_PROPERTIES)
+        for path in self.keys:
+            self.custom_properties[path] = (self.decode, encode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """Close and delete every record file of the session."""
+        for store in self.stores.values():
+            store.close()
+        self.stores.clear()
+
+    def decode(
+        self, reader: FArchiveReader, type_name: str, size: int, path: str
+    ) -> dict[str, Any]:
+        store = SpillStore(self.directory, self.keys[path])
+        if path in self.stores:
+            self.stores[path].close()
+        self.stores[path] = store
+        if type_name == "ArrayProperty":
+            return decode_array(reader, path, store)
+        if type_name == "MapProperty":
+            return decode_map(reader, path, store)
+        raise Exception(
+            f"Expected ArrayProperty or MapProperty, got {type_name}"
+        )
+
+
+def decode_array(
+    reader: FArchiveReader, path: str, store: SpillStore
+) -> dict[str, Any]:
+    array_type = reader.fstring()
+    if array_type != "StructProperty":
+        raise Exception(f"Expected StructProperty array, got {array_type}")
+    _id = reader.optional_guid()
+    count = reader.u32()
+    prop_name = reader.fstring()
+    prop_type = reader.fstring()
+    reader.u64()
+    type_name = reader.fstring()
+    struct_id = reader.guid()
+    reader.skip(1)
+    for _ in range(count):
+        store.append(reader.struct_value(type_name, f"{path}.{prop_name}"))
+    return {
+        "array_type": array_type,
+        "id": _id,
+        "value": {
+            "prop_name": prop_name,
+            "prop_type": prop_type,
+            "values": store,
+            "type_name": type_name,
+            "id": struct_id,
+        },
+    }
+
+
+def decode_map(
+    reader: FArchiveReader, path: str, store: SpillStore
+) -> dict[str, Any]:
+    key_type = reader.fstring()
+    value_type = reader.fstring()
+    _id = reader.optional_guid()
+    reader.u32()
+    count = reader.u32()
+    key_path = path + ".Key"
+    if key_type == "StructProperty":
+        key_struct_type = reader.get_type_or(key_path, "Guid")
+    else:
+        key_struct_type = None
+    value_path = path + ".Value"
+    if value_type == "StructProperty":
+        value_struct_type = reader.get_type_or(value_path, "StructProperty")
+    else:
+        value_struct_type = None
+    for _ in range(count):
+        key = reader.prop_value(key_type, key_struct_type, key_path)
+        value = reader.prop_value(value_type, value_struct_type, value_path)
+        store.append({"key": key, "value": value})
+    return {
+        "key_type": key_type,
+        "value_type": value_type,
+        "key_struct_type": key_struct_type,
+        "value_struct_type": value_struct_type,
+        "id": _id,
+        "value": store,
+    }
+
+
+def encode(
+    writer: FArchiveWriter, property_type: str, properties: dict[str, Any]
+) -> int:
+    if property_type not in ("ArrayProperty", "MapProperty"):
+        raise Exception(
+            f"Expected ArrayProperty or MapProperty, got {property_type}"
+        )
+    properties = dict(properties)
+    del properties["custom_type"]
+    return writer.property_inner(property_type, properties)
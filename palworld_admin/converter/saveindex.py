@@ -0,0 +1,491 @@
+"""Persistent SQLite index over a Palworld world's save files."""
+
+import glob
+import os
+import sqlite3
+import uuid
+from typing import Any, Optional
+
+from palworld_admin.converter.batch import run_batch
+from palworld_admin.converter.lib.gvas import GvasFile
+from palworld_admin.converter.lib.palsav import decompress_sav_to_gvas
+from palworld_admin.converter.lib.paltypes import (
+    PALWORLD_CUSTOM_PROPERTIES,
+    PALWORLD_TYPE_HINTS,
+)
+from palworld_admin.converter.lib.spill import SpillSession
+
+INDEX_FILENAME = "palworld-admin-index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS guilds (
+    group_id TEXT PRIMARY KEY,
+    name TEXT,
+    base_camp_level INTEGER,
+    admin_player_uid TEXT,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    player_uid TEXT PRIMARY KEY,
+    name TEXT,
+    level INTEGER,
+    guild_id TEXT,
+    instance_id TEXT,
+    last_online INTEGER,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS player_containers (
+    player_uid TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    container_id TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pals (
+    instance_id TEXT PRIMARY KEY,
+    character_id TEXT,
+    nickname TEXT,
+    level INTEGER,
+    owner_uid TEXT,
+    container_id TEXT,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS container_items (
+    container_id TEXT NOT NULL,
+    slot INTEGER,
+    item_id TEXT NOT NULL,
+    count INTEGER,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bases (
+    base_id TEXT PRIMARY KEY,
+    name TEXT,
+    guild_id TEXT,
+    x REAL,
+    y REAL,
+    z REAL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_guild ON players (guild_id);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+CREATE INDEX IF NOT EXISTS player_containers_container
+    ON player_containers (container_id);
+CREATE INDEX IF NOT EXISTS pals_owner ON pals (owner_uid);
+CREATE INDEX IF NOT EXISTS container_items_item ON container_items (item_id);
+CREATE INDEX IF NOT EXISTS bases_guild ON bases (guild_id);
+"""
+
+DATA_TABLES = (
+    "guilds",
+    "players",
+    "player_containers",
+    "pals",
+    "container_items",
+    "bases",
+)
+
+
+def prop(properties: Any, *names: str) -> Any:
+    """Walk nested GVAS properties by name, unwrapping their "value" entries.
+
+    Args:
+        properties: A decoded property dictionary.
+        *names (str): The property names to follow.
+
+    Returns:
+        The unwrapped value, or None if any property along the way is missing.
+    """
+    value = properties
+    for name in names:
+        if not isinstance(value, dict) or name not in value:
+            return None
+        value = value[name]
+        while isinstance(value, dict) and "value" in value:
+            value = value["value"]
+    return value
+
+
+def as_id(value: Any) -> Optional[str]:
+    """Return a GUID as a string, or None for a missing or empty GUID."""
+    if value is None:
+        return None
+    value = str(value)
+    if value == "00000000-0000-0000-0000-000000000000":
+        return None
+    return value
+
+
+def read_gvas(filename: str, custom_properties: dict = None) -> GvasFile:
+    """Decompress and parse a .sav file."""
+    with open(filename, "rb") as f:
+        raw_gvas, _ = decompress_sav_to_gvas(f.read())
+    return GvasFile.read(
+        raw_gvas,
+        PALWORLD_TYPE_HINTS,
+        (
+            PALWORLD_CUSTOM_PROPERTIES
+            if custom_properties is None
+            else custom_properties
+        ),
+    )
+
+
+def level_rows(gvas_file: GvasFile) -> dict[str, list[tuple]]:
+    """Extract index rows from a parsed Level.sav.
+
+    Args:
+        gvas_file (GvasFile): The parsed Level.sav.
+
+    Returns:
+        dict: Rows keyed by table name, without the source column.
+    """
+    world = prop(gvas_file.properties, "worldSaveData") or {}
+    rows = {table: [] for table in DATA_TABLES}
+    players = {}
+
+    for group in prop(world, "GroupSaveDataMap") or []:
+        raw = prop(group["value"], "RawData") or {}
+        if raw.get("group_type") != "EPalGroupType::Guild":
+            continue
+        group_id = as_id(raw.get("group_id") or group["key"])
+        rows["guilds"].append(
+            (
+                group_id,
+                raw.get("guild_name"),
+                raw.get("base_camp_level"),
+                as_id(raw.get("admin_player_uid")),
+            )
+        )
+        for player in raw.get("players", []):
+            info = player.get("player_info", {})
+            players[as_id(player["player_uid"])] = {
+                "name": info.get("player_name"),
+                "level": None,
+                "guild_id": group_id,
+                "instance_id": None,
+                "last_online": info.get("last_online_real_time"),
+            }
+
+    for character in prop(world, "CharacterSaveParameterMap") or []:
+        key = character["key"]
+        parameter = prop(
+            character["value"], "RawData", "object", "SaveParameter"
+        )
+        if not parameter:
+            continue
+        instance_id = as_id(prop(key, "InstanceId"))
+        level = prop(parameter, "Level") or 1
+        if prop(parameter, "IsPlayer"):
+            player_uid = as_id(prop(key, "PlayerUId"))
+            player = players.setdefault(
+                player_uid,
+                {"guild_id": None, "last_online": None},
+            )
+            player["name"] = prop(parameter, "NickName") or player.get("name")
+            player["level"] = level
+            player["instance_id"] = instance_id
+        else:
+            rows["pals"].append(
+                (
+                    instance_id,
+                    prop(parameter, "CharacterID"),
+                    prop(parameter, "NickName"),
+                    level,
+                    as_id(prop(parameter, "OwnerPlayerUId")),
+                    as_id(prop(parameter, "SlotID", "ContainerId", "ID")),
+                )
+            )
+
+    for player_uid, player in players.items():
+        rows["players"].append(
+            (
+                player_uid,
+                player.get("name"),
+                player.get("level"),
+                player.get("guild_id"),
+                player.get("instance_id"),
+                player.get("last_online"),
+            )
+        )
+
+    for container in prop(world, "ItemContainerSaveData") or []:
+        container_id = as_id(prop(container["key"], "ID"))
+        slots = prop(container["value"], "Slots") or {}
+        for slot in slots.get("values", []):
+            item_id = prop(slot, "ItemId", "StaticId")
+            count = prop(slot, "StackCount") or 0
+            if not item_id or item_id == "None" or count <= 0:
+                continue
+            rows["container_items"].append(
+                (container_id, prop(slot, "SlotIndex"), item_id, count)
+            )
+
+    for base in prop(world, "BaseCampSaveData") or []:
+        raw = prop(base["value"], "RawData") or {}
+        translation = raw.get("transform", {}).get("translation", {})
+        rows["bases"].append(
+            (
+                as_id(raw.get("id") or base["key"]),
+                raw.get("name"),
+                as_id(raw.get("group_id_belong_to")),
+                translation.get("x"),
+                translation.get("y"),
+                translation.get("z"),
+            )
+        )
+
+    return rows
+
+
+def player_rows(gvas_file: GvasFile) -> dict[str, list[tuple]]:
+    """Extract index rows from a parsed Players/<uid>.sav.
+
+    Args:
+        gvas_file (GvasFile): The parsed player save.
+
+    Returns:
+        dict: Rows keyed by table name, without the source column.
+    """
+    save_data = prop(gvas_file.properties, "SaveData") or {}
+    rows = {table: [] for table in DATA_TABLES}
+    player_uid = as_id(prop(save_data, "PlayerUId"))
+    if player_uid is None:
+        return rows
+    containers = dict(save_data)
+    containers.update(prop(save_data, "inventoryInfo") or {})
+    for name in containers:
+        if not name.endswith("ContainerId"):
+            continue
+        container_id = as_id(prop(containers, name, "ID"))
+        if container_id:
+            rows["player_containers"].append(
+                (player_uid, name[: -len("ContainerId")], container_id)
+            )
+    return rows
+
+
+def index_source(path: str) -> tuple[dict[str, list[tuple]], int, int]:
+    """Parse a source file into index rows.
+
+    This runs in the batch worker processes, so it only returns plain data.
+
+    Returns:
+        tuple: The rows keyed by table name, and the mtime and size of the
+            file that was parsed.
+    """
+    stat = os.stat(path)
+    if os.path.basename(path) == "Level.sav":
+        # Map objects and foliage are not indexed, keep them out of memory
+        with SpillSession() as spill:
+            rows = level_rows(read_gvas(path, spill.custom_properties))
+    else:
+        rows = player_rows(read_gvas(path))
+    return rows, stat.st_mtime_ns, stat.st_size
+
+
+class SaveIndex:
+    """SQLite index over Level.sav and Players/*.sav of one world.
+
+    Sources are only re-parsed when their mtime or size changes, so
+    refreshing an up to date index costs a handful of stat calls.
+    """
+
+    def __init__(self, world_path: str, index_path: str = None):
+        """
+        Initialize a SaveIndex object.
+
+        Args:
+            world_path (str): The world directory containing Level.sav.
+            index_path (str, optional): The SQLite file to use. Defaults to
+                palworld-admin-index.db inside the world directory.
+        """
+        self.world_path = os.path.abspath(world_path)
+        self.index_path = index_path or os.path.join(
+            self.world_path, INDEX_FILENAME
+        )
+        self.conn = sqlite3.connect(self.index_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """Close the index database."""
+        self.conn.close()
+
+    def source_files(self) -> list[str]:
+        """Return the save files that feed the index."""
+        sources = []
+        level_sav = os.path.join(self.world_path, "Level.sav")
+        if os.path.isfile(level_sav):
+            sources.append(level_sav)
+        sources.extend(
+            sorted(
+                glob.glob(os.path.join(self.world_path, "Players", "*.sav"))
+            )
+        )
+        return sources
+
+    def stale_sources(self) -> tuple[list[str], list[str]]:
+        """Return the changed and the removed source files."""
+        known = {
+            row["path"]: (row["mtime_ns"], row["size"])
+            for row in self.conn.execute("SELECT * FROM sources")
+        }
+        changed = []
+        for path in self.source_files():
+            stat = os.stat(path)
+            if known.pop(path, None) != (stat.st_mtime_ns, stat.st_size):
+                changed.append(path)
+        return changed, list(known)
+
+    def refresh(
+        self, progress=None, workers: int = None
+    ) -> tuple[list[str], list[tuple[str, str]]]:
+        """
+        Re-index every source file that changed since the last refresh.
+
+        Changed files are parsed on a process pool and their rows are
+        written to the index as each one finishes.
+
+        Args:
+            progress (callable, optional): Called with the number of parsed
+                files, the total and the path that was just parsed.
+            workers (int, optional): The process pool size. Defaults to the
+                CPU count.
+
+        Returns:
+            tuple: The paths that were re-indexed, and the path and error
+                message of every file that could not be parsed.
+        """
+        changed, removed = self.stale_sources()
+        for path in removed:
+            self.replace_source(path, None)
+        indexed, failed = [], []
+        for done, (path, result, error) in enumerate(
+            run_batch(index_source, changed, workers), start=1
+        ):
+            if error:
+                failed.append((path, error))
+            else:
+                rows, mtime_ns, size = result
+                self.replace_source(path, rows, (mtime_ns, size))
+                indexed.append(path)
+            if progress:
+                progress(done, len(changed), path)
+        return indexed, failed
+
+    def replace_source(
+        self,
+        path: str,
+        rows: Optional[dict],
+        signature: tuple[int, int] = None,
+    ) -> None:
+        """
+        Replace every row that came from path in a single transaction.
+
+        Args:
+            path (str): The source file.
+            rows (dict): Rows keyed by table name, or None to drop the source.
+            signature (tuple, optional): The mtime_ns and size of the parsed
+                file. Defaults to the current ones.
+        """
+        with self.conn:
+            for table in DATA_TABLES:
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE source = ?", (path,)
+                )
+            self.conn.execute("DELETE FROM sources WHERE path = ?", (path,))
+            if rows is None:
+                return
+            for table, table_rows in rows.items():
+                if not table_rows:
+                    continue
+                placeholders = ", ".join("?" * (len(table_rows[0]) + 1))
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})",
+                    [row + (path,) for row in table_rows],
+                )
+            if signature is None:
+                stat = os.stat(path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+            self.conn.execute(
+                "INSERT INTO sources VALUES (?, ?, ?)", (path,) + signature
+            )
+
+    def query(self, sql: str, params: tuple = ()) -> list[dict]:
+        """Run a read query against the index and return the rows as dicts."""
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def players(self, guild: str = None) -> list[dict]:
+        """Return players, optionally only those of the guild with this name or id."""
+        sql = (
+            "SELECT p.player_uid, p.name, p.level, g.name AS guild,"
+            " p.guild_id, p.last_online FROM players p"
+            " LEFT JOIN guilds g ON g.group_id = p.guild_id"
+        )
+        if guild is None:
+            return self.query(sql + " ORDER BY g.name, p.name")
+        return self.query(
+            sql + " WHERE g.name = ? OR p.guild_id = ? ORDER BY p.name",
+            (guild, normalize_id(guild)),
+        )
+
+    def pals(self, owner: str = None) -> list[dict]:
+        """Return pals, optionally only those owned by the player with this name or uid."""
+        sql = (
+            "SELECT a.instance_id, a.character_id, a.nickname, a.level,"
+            " a.owner_uid, p.name AS owner FROM pals a"
+            " LEFT JOIN players p ON p.player_uid = a.owner_uid"
+        )
+        if owner is None:
+            return self.query(sql + " ORDER BY p.name, a.character_id")
+        return self.query(
+            sql + " WHERE p.name = ? OR a.owner_uid = ?"
+            " ORDER BY a.character_id",
+            (owner, normalize_id(owner)),
+        )
+
+    def containers(self, item: str) -> list[dict]:
+        """Return the containers holding the item with this static id."""
+        return self.query(
+            "SELECT i.container_id, i.item_id, i.count, c.kind,"
+            " c.player_uid, p.name AS owner FROM ("
+            "SELECT container_id, item_id, SUM(count) AS count"
+            " FROM container_items WHERE item_id = ? GROUP BY container_id"
+            ") i"
+            " LEFT JOIN player_containers c ON c.container_id = i.container_id"
+            " LEFT JOIN players p ON p.player_uid = c.player_uid"
+            " ORDER BY i.count DESC",
+            (item,),
+        )
+
+    def bases(
+        self, min_level: int = None, max_level: int = None
+    ) -> list[dict]:
+        """Return bases with the level of the guild that owns them."""
+        return self.query(
+            "SELECT b.base_id, b.name, g.name AS guild,"
+            " g.base_camp_level AS level, b.x, b.y, b.z FROM bases b"
+            " LEFT JOIN guilds g ON g.group_id = b.guild_id"
+            " WHERE (? IS NULL OR g.base_camp_level >= ?)"
+            " AND (? IS NULL OR g.base_camp_level <= ?)"
+            " ORDER BY level DESC, guild",
+            (min_level, min_level, max_level, max_level),
+        )
+
+
+def normalize_id(value: str) -> str:
+    """Return value as a dashed GUID if it is one, so raw uids match too."""
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return value
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+import time
+
+from palworld_admin.converter.batch import (
+    convert_players_to_jsonl,
+    player_save_paths,
+)
+from palworld_admin.converter.saveindex import SaveIndex
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="palworld-admin save",
+        description="Index and query Palworld world save files",
+    )
+    parser.add_argument(
+        "world",
+        help="World directory (Pal/Saved/SaveGames/0/<world>) holding Level.sav",
+    )
+    parser.add_argument(
+        "--index",
+        help="Index database (default: <world>/palworld-admin-index.db)",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print results as JSON lines"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes used to parse saves (default: CPU count)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("index", help="Build or update the index")
+    batch = subparsers.add_parser(
+        "batch", help="Convert every player save to JSON lines"
+    )
+    batch.add_argument(
+        "--output",
+        default="-",
+        help="JSONL file to write (default: standard output)",
+    )
+
+    query = subparsers.add_parser("query", help="Query the index")
+    query_subparsers = query.add_subparsers(dest="query", required=True)
+    players = query_subparsers.add_parser("players", help="Players by guild")
+    players.add_argument("--guild", help="Guild name or id")
+    pals = query_subparsers.add_parser("pals", help="Pals by owner")
+    pals.add_argument("--owner", help="Owner name or player uid")
+    containers = query_subparsers.add_parser(
+        "containers", help="Containers holding an item"
+    )
+    containers.add_argument("item", help="Item static id, e.g. Wood")
+    bases = query_subparsers.add_parser("bases", help="Bases by level")
+    bases.add_argument("--min-level", type=int)
+    bases.add_argument("--max-level", type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        return run_batch_conversion(args)
+
+    with SaveIndex(args.world, args.index) as save_index:
+        start = time.perf_counter()
+        updated, failed = save_index.refresh(
+            progress=print_progress, workers=args.workers
+        )
+        for path, error in failed:
+            print(f"Failed to index {path}: {error}", file=sys.stderr)
+        if updated:
+            print(
+                f"Indexed {len(updated)} file(s) in {time.perf_counter() - start:.2f}s",
+                file=sys.stderr,
+            )
+        if args.command == "index":
+            return 0
+
+        start = time.perf_counter()
+        if args.query == "players":
+            rows = save_index.players(args.guild)
+        elif args.query == "pals":
+            rows = save_index.pals(args.owner)
+        elif args.query == "containers":
+            rows = save_index.containers(args.item)
+        else:
+            rows = save_index.bases(args.min_level, args.max_level)
+        elapsed = time.perf_counter() - start
+
+    print_rows(rows, args.json)
+    print(f"{len(rows)} row(s) in {elapsed * 1000:.1f}ms", file=sys.stderr)
+    return 0
+
+
+def run_batch_conversion(args) -> int:
+    paths = player_save_paths(args.world)
+    if not paths:
+        print(f"No player saves found in {args.world}", file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    if args.output == "-":
+        failed = convert_players_to_jsonl(
+            paths, sys.stdout, args.workers, print_progress
+        )
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            failed = convert_players_to_jsonl(
+                paths, f, args.workers, print_progress
+            )
+    for path, error in failed:
+        print(f"Failed to convert {path}: {error}", file=sys.stderr)
+    print(
+        f"Converted {len(paths) - len(failed)} of {len(paths)} player save(s)"
+        f" in {time.perf_counter() - start:.2f}s",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def print_progress(done: int, total: int, path: str):
+    print(f"[{done}/{total}] {path}", file=sys.stderr)
+
+
+def print_rows(rows: list[dict], as_json: bool):
+    if as_json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    print("\t".join(columns))
+    for row in rows:
+        print(
+            "\t".join("" if row[c] is None else str(row[c]) for c in columns)
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
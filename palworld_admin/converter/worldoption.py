@@ -0,0 +1,146 @@
+"""In-memory builder for WorldOption.sav files."""
+
+import os
+import tempfile
+
+from palworld_admin.converter.lib.archive import FArchiveWriter
+from palworld_admin.converter.lib.gvas import GvasHeader
+from palworld_admin.converter.lib.palsav import compress_gvas_to_sav
+
+WORLD_OPTION_TRAILER = b"\x00\x00\x00\x00"
+WORLD_OPTION_VERSION = 100
+
+
+class WorldOptionSaveBuilder:
+    """Build WorldOption.sav bytes directly from a settings dictionary.
+
+    The GVAS header never changes, so it is encoded once when the builder is
+    created and every generated save only serializes the property tree.
+    """
+
+    def __init__(self, header: dict, default_values: dict):
+        """
+        Initialize a WorldOptionSaveBuilder object.
+
+        Args:
+            header (dict): The GVAS header in its JSON representation.
+            default_values (dict): The default PalWorldSettings values. Only
+                values that differ from these are written to the save.
+        """
+        writer = FArchiveWriter()
+        gvas_header = GvasHeader.load(header)
+        gvas_header.write(writer)
+        self.header_bytes = writer.bytes()
+        self.default_values = default_values
+        if (
+            "Pal.PalWorldSaveGame" in gvas_header.save_game_class_name
+            or "Pal.PalLocalWorldSaveGame" in gvas_header.save_game_class_name
+        ):
+            self.save_type = 0x32
+        else:
+            self.save_type = 0x31
+
+    def settings_properties(
+        self, data: dict, strip_quotes: bool = False
+    ) -> dict:
+        """
+        Convert submitted settings into PalOptionWorldSettings properties.
+
+        Args:
+            data (dict): The submitted settings, keyed by setting name.
+            strip_quotes (bool): Remove single and double quotes from string values.
+
+        Returns:
+            dict: The properties of the PalOptionWorldSettings struct.
+        """
+        properties = {}
+        for key, default_value in self.default_values.items():
+            submitted_value = str(data.get(key, default_value))
+            if submitted_value == str(default_value):
+                continue
+            if submitted_value.lower() in ["true", "false"]:
+                value = submitted_value.lower() == "true"
+                _type = "BoolProperty"
+            elif submitted_value.replace(".", "", 1).isdigit():
+                if "." in submitted_value:
+                    value = float(submitted_value)
+                    _type = "FloatProperty"
+                else:
+                    value = int(submitted_value)
+                    _type = "IntProperty"
+            else:
+                if strip_quotes:
+                    for char in ["'", '"']:
+                        submitted_value = submitted_value.replace(char, "")
+                value = submitted_value
+                _type = "StrProperty"
+
+            properties[key] = {"id": None, "value": value, "type": _type}
+        return properties
+
+    def build(self, data: dict, strip_quotes: bool = False) -> bytes:
+        """
+        Build a compressed WorldOption.sav from the submitted settings.
+
+        Args:
+            data (dict): The submitted settings, keyed by setting name.
+            strip_quotes (bool): Remove single and double quotes from string values.
+
+        Returns:
+            bytes: The contents of the WorldOption.sav file.
+        """
+        properties = {
+            "Version": {
+                "id": None,
+                "value": WORLD_OPTION_VERSION,
+                "type": "IntProperty",
+            },
+            "OptionWorldData": {
+                "struct_type": "PalOptionWorldSaveData",
+                "struct_id": "00000000-0000-0000-0000-000000000000",
+                "id": None,
+                "value": {
+                    "Settings": {
+                        "struct_type": "PalOptionWorldSettings",
+                        "struct_id": "00000000-0000-0000-0000-000000000000",
+                        "id": None,
+                        "value": self.settings_properties(data, strip_quotes),
+                        "type": "StructProperty",
+                    }
+                },
+                "type": "StructProperty",
+            },
+        }
+        writer = FArchiveWriter()
+        writer.write(self.header_bytes)
+        writer.properties(properties)
+        writer.write(WORLD_OPTION_TRAILER)
+        return compress_gvas_to_sav(writer.bytes(), self.save_type)
+
+    def write(
+        self, data: dict, target_file: str, strip_quotes: bool = False
+    ) -> None:
+        """
+        Build a WorldOption.sav and atomically replace target_file with it.
+
+        Args:
+            data (dict): The submitted settings, keyed by setting name.
+            target_file (str): The path of the WorldOption.sav to write.
+            strip_quotes (bool): Remove single and double quotes from string values.
+        """
+        sav_data = self.build(data, strip_quotes)
+        target_dir = os.path.dirname(os.path.abspath(target_file))
+        os.makedirs(target_dir, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(
+            prefix=".WorldOption.", suffix=".tmp", dir=target_dir
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(sav_data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, target_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
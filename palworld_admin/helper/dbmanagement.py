@@ -11,7 +11,10 @@ from palworld_admin.classes.dbmodels import (
     LauncherSettings,
     Connection,
     Players,
+    RconCommandLog,
 )
+from palworld_admin.classes.commandhistory import CommandHistory
+from palworld_admin.classes.playerregistry import PlayerRegistry
 
 
 def get_alembic_version() -> str:
@@ -158,45 +161,73 @@ def save_user_settings_to_db(user_settings) -> dict:
     return result
 
 
-def commit_players_to_db(players: list) -> None:
-    """Commit a list of players to the database."""
+def commit_players_to_db(players: PlayerRegistry) -> None:
+    """Commit the players that changed since the last commit to the database."""
+    changed = players.take_dirty()
+    if not changed:
+        return
 
     # Dynamically build a list of fields from the Players table (excluding the id field)
     fields = [
         column.name for column in inspect(Players).c if column.name != "id"
     ]
 
-    for player in players:
-        if "steam_id" in player and player["steam_id"]:
-            # Try to find the player in the database
-            existing_player = Players.query.filter_by(
-                steam_id=player["steam_id"]
-            ).first()
+    # Load every changed player that is already in the database at once
+    existing_players = {
+        player.steam_id: player
+        for player in Players.query.filter(
+            Players.steam_id.in_([player["steam_id"] for player in changed])
+        )
+    }
 
-            if existing_player:
-                # Player exists, so we update their information
-                for field in fields:
-                    if field in player:
-                        setattr(existing_player, field, player[field])
-            else:
-                # No existing player found, prepare a new record
-                # Ensure only fields relevant to the Players table are included
-                player_data = {
-                    field: player[field] for field in fields if field in player
-                }
-                new_player = Players(**player_data)
-                db.session.add(new_player)
+    for player in changed:
+        existing_player = existing_players.get(player["steam_id"])
+        if existing_player:
+            # Player exists, so we update their information
+            for field in fields:
+                if field in player:
+                    setattr(existing_player, field, player[field])
+        else:
+            # No existing player found, prepare a new record
+            # Ensure only fields relevant to the Players table are included
+            player_data = {
+                field: player[field] for field in fields if field in player
+            }
+            new_player = Players(**player_data)
+            db.session.add(new_player)
 
     try:
         db.session.commit()
-        logging.info("Committed %s players to the database.", len(players))
+        logging.info("Committed %s players to the database.", len(changed))
     except Exception as e:  # pylint: disable=broad-except
         db.session.rollback()
+        # Keep the players dirty so the next commit retries them
+        players.mark_dirty(changed)
         logging.error("Error committing players to the database: %s", str(e))
     finally:
         db.session.close()
 
 
+def commit_command_history_to_db(history: CommandHistory) -> None:
+    """Write the commands recorded since the last commit to the database."""
+    unsaved = history.take_unsaved()
+    if not unsaved:
+        return
+
+    try:
+        db.session.bulk_insert_mappings(RconCommandLog, unsaved)
+        db.session.commit()
+    except Exception as e:  # pylint: disable=broad-except
+        db.session.rollback()
+        # Keep the records queued so the next commit retries them
+        history.mark_unsaved(unsaved)
+        logging.error(
+            "Error committing command history to the database: %s", str(e)
+        )
+    finally:
+        db.session.close()
+
+
 def get_players_from_db() -> list:
     """Return a list of all players from the database."""
     fields = [
@@ -209,3 +240,90 @@ def get_players_from_db() -> list:
         player_info = {field: getattr(player, field) for field in fields}
         player_list.append(player_info)
     return player_list
+
+
+def server_connections_query():
+    """Return a query for the RCON servers saved to the monitored cluster."""
+    return Connection.query.filter(Connection.monitored.is_(True))
+
+
+def get_connections_from_db() -> list:
+    """Return the RCON servers saved to the monitored cluster."""
+    connection_list = [
+        {
+            "name": connection.name,
+            "host": connection.host,
+            "port": connection.port,
+            "password": connection.password,
+        }
+        for connection in server_connections_query().all()
+    ]
+    db.session.close()
+    return connection_list
+
+
+def save_connection_to_db(name: str, connection_data: dict) -> dict:
+    """
+    Save an RCON server to the database, by name.
+
+    Only cluster servers are matched, so the last connection and the other
+    connections saved by the launcher are never overwritten.
+
+    Args:
+        name (str): The name of the server.
+        connection_data (dict): The host, port and password of the server.
+
+    Returns:
+        dict: The status, and whether the server was created or updated.
+    """
+    result = {}
+    try:
+        connection = server_connections_query().filter_by(name=name).first()
+        if connection:
+            # update_object_fields skips ports, which a server may change
+            updated_fields = []
+            for field in ("host", "port", "password"):
+                if getattr(connection, field) != connection_data[field]:
+                    setattr(connection, field, connection_data[field])
+                    updated_fields.append(field)
+            if updated_fields:
+                db.session.commit()
+                result["connection"] = (
+                    f"updated: {' and '.join(updated_fields)}"
+                )
+        else:
+            db.session.add(
+                Connection(name=name, monitored=True, **connection_data)
+            )
+            db.session.commit()
+            result["connection"] = "created"
+        result["status"] = "success"
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        result["status"] = "error"
+        result["error"] = str(e)
+        logging.error("Error saving connection to the database: %s", e)
+    finally:
+        db.session.close()
+    return result
+
+
+def delete_connection_from_db(name: str) -> dict:
+    """Delete a saved RCON server from the database, by name."""
+    result = {}
+    try:
+        result["deleted"] = (
+            server_connections_query()
+            .filter_by(name=name)
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+        result["status"] = "success"
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        result["status"] = "error"
+        result["error"] = str(e)
+        logging.error("Error deleting connection from the database: %s", e)
+    finally:
+        db.session.close()
+    return result
@@ -1,7 +1,11 @@
 """Helper functions for running OS commands."""
 
 import logging
+import os
+import platform
+import selectors
 import subprocess
+import time
 
 NON_VM_MODELS_REQUIRING_CORE_DIVISION = ["MS-7D42"]
 
@@ -85,3 +89,97 @@ def detect_virtual_machine(operating_system: str) -> bool:
             result["error"] = str(e)
             logging.error("Error detecting virtual machine: %s", e)
     return result
+
+
+def wait_for_process_exit(
+    pid: int, timeout: float, process: subprocess.Popen = None
+) -> bool:
+    """
+    Wait for a process to exit, without polling where the OS allows it.
+
+    Args:
+        pid (int): The process ID, used when process is None.
+        timeout (float): The most seconds to wait.
+        process (subprocess.Popen, optional): The process, if this app
+            started it.
+
+    Returns:
+        bool: True if the process exited, False if the timeout expired.
+    """
+    if process is not None:
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        return True
+
+    pid = int(pid)
+    if hasattr(os, "pidfd_open"):
+        # Linux: a pidfd becomes readable when the process exits
+        try:
+            pidfd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return True
+        except OSError as e:
+            logging.info("pidfd_open failed, polling instead: %s", e)
+        else:
+            try:
+                with selectors.DefaultSelector() as selector:
+                    selector.register(pidfd, selectors.EVENT_READ)
+                    return bool(selector.select(timeout))
+            finally:
+                os.close(pidfd)
+    elif platform.system() == "Windows":
+        exited = _wait_for_windows_process(pid, timeout)
+        if exited is not None:
+            return exited
+
+    deadline = time.monotonic() + timeout
+    while _process_exists(pid):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.2)
+    return True
+
+
+def _wait_for_windows_process(pid: int, timeout: float):
+    """Wait on a process handle, returning None if it can't be opened."""
+    # fmt: off
+    import ctypes                                                   # pylint: disable=import-outside-toplevel
+    # fmt: on
+
+    synchronize = 0x00100000
+    wait_object_0 = 0
+    error_invalid_parameter = 87
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(synchronize, False, pid)
+    if not handle:
+        if ctypes.get_last_error() == error_invalid_parameter:
+            # There is no process with that ID
+            return True
+        return None
+    try:
+        result = kernel32.WaitForSingleObject(handle, int(timeout * 1000))
+        return result == wait_object_0
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _process_exists(pid: int) -> bool:
+    """Check if a process exists, on systems without a way to wait on it."""
+    if platform.system() == "Windows":
+        # os.kill would terminate the process on Windows
+        result = subprocess.run(
+            ["tasklist", "/fi", f"PID eq {pid}"],
+            capture_output=True,
+            check=False,
+            text=True,
+        )
+        return "No tasks are running" not in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
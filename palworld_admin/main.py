@@ -2,6 +2,7 @@
 It launches the Flask app and then the UI for the app. """
 
 import logging
+import multiprocessing
 import os
 import platform
 import sys
@@ -15,14 +16,26 @@ sys.path.append(str(current_dir))
 if platform.system() == "Linux":
     sys.path.append(os.getcwd())
 
-# fmt: off
-from palworld_admin.settings import app_settings                    # pylint: disable=wrong-import-position
-from palworld_admin.website import flask_app                        # pylint: disable=wrong-import-position
-# fmt: on
-
 
 def main():
-    """Launch the Flask app and the UI app."""
+    """Launch the Flask app and the UI app, or run the save tools."""
+    # The save tools only need the converter, so dispatch them before
+    # app_settings is created and tries to parse the server manager's CLI
+    # arguments
+    if len(sys.argv) > 1 and sys.argv[1] == "save":
+        # fmt: off
+        from palworld_admin.converter.savetools import main as save_main    # pylint: disable=import-outside-toplevel
+        # fmt: on
+
+        sys.exit(save_main(sys.argv[2:]))
+
+    # Imported here, so the worker processes of the save tools, which
+    # import this module again, don't build the app settings
+    # fmt: off
+    from palworld_admin.settings import app_settings                    # pylint: disable=import-outside-toplevel
+    from palworld_admin.website import flask_app                        # pylint: disable=import-outside-toplevel
+    # fmt: on
+
     # Launch the Flask app once the settings are ready
     while not app_settings.settings_ready:
         time.sleep(0.1)
@@ -33,4 +46,6 @@ def main():
 
 # Run the app
 if __name__ == "__main__":
+    # Lets the frozen executable run as a process pool worker
+    multiprocessing.freeze_support()
     main()
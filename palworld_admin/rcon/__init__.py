@@ -1,60 +1,246 @@
 """RCON Module for handling RCON commands to a DayZ server."""
 
 import logging
-from queue import Queue
-import os
-import subprocess
+from concurrent.futures import Future, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import threading
 import time
 
 from datetime import datetime
 
 from palworld_admin.helper.dbmanagement import save_user_settings_to_db
-from palworld_admin.rcon.rcon import execute, resolve_address
+from palworld_admin.helper.oscommands import wait_for_process_exit
+from palworld_admin.rcon.parsers import (
+    EMPTY_PLAYER_UID,
+    ShowPlayersParser,
+    parse_getip,
+    parse_info,
+    parse_rcon_commands,
+)
+from palworld_admin.rcon.rcon import (
+    FAILURE_ERROR,
+    FAILURE_TIMEOUT,
+    PRIORITY_ADMIN,
+    PRIORITY_ENFORCEMENT,
+    PRIORITY_MONITORING,
+    CommandFailure,
+    close_connections,
+    normalize_address,
+    submit_commands,
+)
+from palworld_admin.rcon.servers import RconServer, RconServerRegistry
 from palworld_admin.settings import app_settings
 
+# Seconds to wait for the server to exit after its shutdown delay
+SHUTDOWN_GRACE_PERIOD = 30
 
-def execute_rcon(ip_address, port, password, command, queue) -> None:
-    """Execute the specified RCON command and put the result in the queue."""
-    log = False
-    if log:
-        logging.info("Executing RCON command: %s", command)
-    if not app_settings.localserver.connected:
-        try:
-            resolved_ip = resolve_address(ip_address)
-            if "Error" in resolved_ip:
-                result = {
-                    "status": "error",
-                    "message": "Error resolving IP, please try again",
-                }
-                return result
-            app_settings.localserver.ip = resolved_ip
-            logging.info("Resolved IP: %s", resolved_ip)
-        except ValueError as e:
-            logging.info("Error: %s", e)
+# Seconds a player's getip result is reused for
+PLAYER_IP_TTL = 60.0
+
+# steamid -> (IP, time it was looked up)
+player_ip_cache: dict[str, tuple[str, float]] = {}
+player_ip_cache_lock = threading.Lock()
+
+# Reuses the parsed player list while ShowPlayers doesn't change
+showplayers_parser = ShowPlayersParser()
+
+# Seconds negotiated server capabilities are trusted before rcon_connect
+# revalidates them in the background
+CAPABILITIES_TTL = 600.0
+
+# (host, port, password) -> capabilities negotiated by rcon_connect
+server_capabilities: dict[tuple, dict] = {}
+server_capabilities_lock = threading.Lock()
+
+# Servers managed alongside the local server, see fan_out
+rcon_servers = RconServerRegistry()
+
+# Responses that mean Info failed instead of returning the server info
+INFO_ERRORS = (
+    "Failed to execute command",
+    "Error: Invalid Password?",
+    "Could not resolve domain",
+    "Unknown command",
+)
+
+
+def submit_rcon(
+    ip_address,
+    port,
+    password,
+    *commands,
+    timeout: float = 10.0,
+    priority: int = PRIORITY_ADMIN,
+) -> Future:
+    """
+    Start executing RCON commands and return a future for their results.
+
+    Args:
+        ip_address (str): The IP address or hostname of the server.
+        port (int): The RCON port of the server.
+        password (str): The RCON password.
+        *commands (str): The commands to send, in order.
+        timeout (float): Seconds to wait for the responses.
+        priority (int): The scheduling priority of the commands.
+
+    Returns:
+        Future: Resolves to the response of each command, in order.
+    """
+    if app_settings.localserver.connected:
+        host = app_settings.localserver.ip
     else:
-        resolved_ip = app_settings.localserver.ip
-        if log:
-            logging.info("Using cached IP: %s", resolved_ip)
-    host_port = f"{resolved_ip}:{port}"
-    result = execute(
-        host_port,
+        # Host names are resolved on the RCON loop, through its cache
+        host = normalize_address(ip_address)
+        if "Error" in host:
+            future = Future()
+            future.set_result(
+                [CommandFailure(host, FAILURE_ERROR)] * len(commands)
+            )
+            return future
+        app_settings.localserver.ip = host
+    return submit_commands(
+        f"{host}:{port}",
         password,
-        command,
+        list(commands),
         base64_encoded=app_settings.localserver.base64_encoded,
-    ).strip()
-    if log:
-        logging.info("Command Output: %s\n", result)
-    if result:
-        queue.put(result.strip())
+        timeout=timeout,
+        priority=priority,
+    )
+
+
+def strip_result(result: str) -> str:
+    """Strip a response, keeping a CommandFailure as it is."""
+    if isinstance(result, CommandFailure):
+        return result
+    return result.strip()
+
+
+def wait_rcon(future: Future, count: int, timeout: float = 10.0) -> list:
+    """Wait for a future from submit_rcon and return its stripped results."""
+    try:
+        # Leave the connection its own timeout before giving up on the loop
+        results = future.result(timeout=timeout + 5)
+    except FutureTimeoutError:
+        future.cancel()
+        return [CommandFailure("Timed out", FAILURE_TIMEOUT)] * count
+    return [strip_result(result) for result in results]
+
+
+def record_commands(
+    source: str, commands: list, results: list, duration: float
+) -> None:
+    """
+    Add commands and their results to the command history.
+
+    Args:
+        source (str): Where the commands came from, see CommandRecord.
+        commands (list): The commands that were sent.
+        results (list): The result of each command.
+        duration (float): Seconds the caller waited, recorded for results
+            that don't carry their own duration, like failures.
+    """
+    history = app_settings.localserver.command_history
+    for command, result in zip(commands, results):
+        history.record(
+            source, command, result, getattr(result, "duration", duration)
+        )
+
+
+def execute_rcon(
+    ip_address,
+    port,
+    password,
+    command,
+    timeout: float = 10.0,
+    priority: int = PRIORITY_ADMIN,
+    source: str = None,
+) -> str:
+    """Execute the specified RCON command and return its result.
+
+    Commands with a source, like "admin", are recorded in the command
+    history.
+    """
+    return execute_rcon_many(
+        ip_address,
+        port,
+        password,
+        [command],
+        timeout=timeout,
+        priority=priority,
+        source=source,
+    )[0]
+
+
+def execute_rcon_many(
+    ip_address,
+    port,
+    password,
+    commands,
+    timeout: float = 10.0,
+    priority: int = PRIORITY_ADMIN,
+    source: str = None,
+) -> list:
+    """Execute several RCON commands in one round trip and return their results."""
+    start = time.perf_counter()
+    future = submit_rcon(
+        ip_address,
+        port,
+        password,
+        *commands,
+        timeout=timeout,
+        priority=priority,
+    )
+    results = wait_rcon(future, len(commands), timeout)
+    if source is not None:
+        record_commands(source, commands, results, time.perf_counter() - start)
+    return results
+
+
+def fetch_player_ips(ip_address, port, password, steamids) -> dict:
+    """
+    Look up the IPs of several players with PalGuard's getip command.
+
+    Recently looked up players are served from a cache, and the rest are
+    requested together in one round trip.
+
+    Args:
+        steamids (list): The SteamIDs of the players.
+
+    Returns:
+        dict: The IP of each player, by SteamID.
+    """
+    now = time.monotonic()
+    player_ips = {}
+    with player_ip_cache_lock:
+        for steamid in steamids:
+            cached = player_ip_cache.get(steamid)
+            if cached and now - cached[1] < PLAYER_IP_TTL:
+                player_ips[steamid] = cached[0]
+    missing = [steamid for steamid in steamids if steamid not in player_ips]
+    if not missing:
+        return player_ips
+
+    results = execute_rcon_many(
+        ip_address,
+        port,
+        password,
+        [f"getip {steamid}" for steamid in missing],
+        priority=PRIORITY_MONITORING,
+    )
+    with player_ip_cache_lock:
+        for steamid, result in zip(missing, results):
+            player_ip = parse_getip(result)
+            # An unknown IP never matches the player's SteamAuth IP
+            player_ips[steamid] = player_ip or ""
+            if player_ip:
+                player_ip_cache[steamid] = (player_ip, now)
+    return player_ips
 
 
 def rcon_broadcast(
     ip_address, port, password, message: str, command: str
 ) -> dict:
     """Broadcast the specified message to the server."""
-    result_queue = Queue()
-
     if command == "broadcast" and app_settings.localserver.palguard_installed:
         rcon_command = "pgbroadcast"
     elif command == "custom":
@@ -63,21 +249,13 @@ def rcon_broadcast(
     else:
         rcon_command = command
 
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(
-            ip_address,
-            port,
-            password,
-            f"{rcon_command} {message}",
-            result_queue,
-        ),
+    result = execute_rcon(
+        ip_address,
+        port,
+        password,
+        f"{rcon_command} {message}",
+        source="admin",
     )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
-
-    # Retrieve the result from the queue
-    result = result_queue.get()
     logging.info("Broadcast Result: %s", result)
     reply = {}
     if "Failed to execute command" in result:
@@ -102,75 +280,156 @@ def rcon_broadcast(
     return reply
 
 
-def rcon_connect(ip_address, port, password, skip_save: bool = False) -> dict:
-    """Connect to the RCON server and retrieve the server name and version."""
-    app_settings.localserver.base64_encoded = False
-    reply = {}
-    result_queue = Queue()
-
-    # Non-Base64 Connection Attempt
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(ip_address, port, password, "Info", result_queue),
+def capabilities_from(
+    info_result: str, commands_result: str, base64_encoded: bool
+) -> dict:
+    """Build the capabilities of a server from its Info and getrconcmds."""
+    server_info = parse_info(info_result)
+    palguard_installed = not any(
+        error in commands_result
+        for error in ("Unknown command", "Failed to execute command")
     )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
+    return {
+        "base64_encoded": base64_encoded,
+        "palguard_installed": palguard_installed,
+        "palguard_commands": (
+            [
+                command.to_dict()
+                for command in parse_rcon_commands(commands_result)
+            ]
+            if palguard_installed
+            else []
+        ),
+        "server_name": server_info.name,
+        "server_version": server_info.version,
+        "checked": time.monotonic(),
+    }
+
 
-    # Retrieve the result from the queue
-    result: str = result_queue.get()
-    logging.info("Non-Base64 RCON Connection Result: %s", result)
+def negotiate_capabilities(ip_address, port, password) -> tuple:
+    """
+    Find out whether a server takes base64 commands and has PalGuard.
 
-    if "Unknown command" in result:
-        # Switch to Base64 Connection
-        app_settings.localserver.base64_encoded = True
+    Info and getrconcmds are sent together in plain text, and again in
+    base64 if the server doesn't know the plain commands.
 
-        # Base64 Connection Attempt
-        command_thread = threading.Thread(
-            target=execute_rcon,
-            args=(ip_address, port, password, "Info", result_queue),
+    Returns:
+        tuple: The Info response, and the capabilities of the server, or
+            None if Info failed.
+    """
+    for base64_encoded in (False, True):
+        # Unknown until negotiated, so a base64 answer is still detected
+        app_settings.localserver.base64_encoded = base64_encoded or None
+        result, commands_result = execute_rcon_many(
+            ip_address, port, password, ["Info", "getrconcmds"]
         )
-        command_thread.start()
-        command_thread.join()  # Wait for the thread to complete
+        logging.info(
+            "%s RCON Connection Result: %s",
+            "Base64" if base64_encoded else "Non-Base64",
+            result,
+        )
+        if "Unknown command" not in result:
+            break
+    app_settings.localserver.base64_encoded = base64_encoded
+    if any(error in result for error in INFO_ERRORS):
+        return result, None
+    return result, capabilities_from(result, commands_result, base64_encoded)
 
-        # Retrieve the result from the queue
-        result: str = result_queue.get()
-        logging.info("Base64 RCON Connection Result: %s", result)
-    else:
-        app_settings.localserver.base64_encoded = False
-
-    # Check for palguard commands
-    palguard_commands_queue = Queue()
-    palguard_commands_list = []
-    final_palguard_commands_list = []
-    palguard_commands_thread = threading.Thread(
-        target=execute_rcon,
-        args=(
-            ip_address,
-            port,
-            password,
-            "getrconcmds",
-            palguard_commands_queue,
-        ),
+
+def revalidate_capabilities(ip_address, port, password) -> None:
+    """Check the cached capabilities of a server without waiting."""
+    key = (ip_address, str(port), password)
+    base64_encoded = app_settings.localserver.base64_encoded
+    future = submit_rcon(
+        ip_address,
+        port,
+        password,
+        "Info",
+        "getrconcmds",
+        priority=PRIORITY_MONITORING,
     )
-    palguard_commands_thread.start()
-    palguard_commands_thread.join()  # Wait for the thread to complete
-    palguard_commands_result: str = palguard_commands_queue.get()
-    if "Unknown command" not in palguard_commands_result:
-        app_settings.localserver.palguard_installed = True
-        palguard_commands_list = palguard_commands_result.split(";")
-        palguard_commands_list.sort()
-        # Remove any empty strings from the list
-        palguard_commands_list = [
-            command for command in palguard_commands_list if command != ""
+
+    def revalidated(future):
+        try:
+            result, commands_result = [
+                result.strip() for result in future.result()
+            ]
+        except Exception:  # pylint: disable=broad-except
+            return
+        if "Unknown command" in result:
+            # The encoding changed, the next connect negotiates again
+            forget_capabilities(ip_address, port, password)
+            return
+        if any(error in result for error in INFO_ERRORS):
+            return
+        capabilities = capabilities_from(
+            result, commands_result, base64_encoded
+        )
+        with server_capabilities_lock:
+            server_capabilities[key] = capabilities
+        app_settings.localserver.palguard_installed = capabilities[
+            "palguard_installed"
         ]
-        for command in palguard_commands_list:
-            command_name = command.split(":")[0]
-            command_args = command.split(":")[1]
-            command_dict = {"name": command_name, "args": command_args}
-            final_palguard_commands_list.append(command_dict)
-        reply["palguard_commands"] = final_palguard_commands_list
-    else:
-        app_settings.localserver.palguard_installed = False
+
+    future.add_done_callback(revalidated)
+
+
+def forget_capabilities(ip_address, port, password) -> None:
+    """Drop the cached capabilities of a server."""
+    with server_capabilities_lock:
+        server_capabilities.pop((ip_address, str(port), password), None)
+
+
+def rcon_connect(ip_address, port, password, skip_save: bool = False) -> dict:
+    """Connect to the RCON server and retrieve the server name and version.
+
+    The encoding, PalGuard commands and version negotiated with a server
+    are cached, so connecting to it again takes a single Info round trip.
+    Capabilities older than CAPABILITIES_TTL are revalidated in the
+    background.
+    """
+    reply = {}
+    key = (ip_address, str(port), password)
+    with server_capabilities_lock:
+        capabilities = server_capabilities.get(key)
+
+    result = None
+    if capabilities is not None:
+        app_settings.localserver.base64_encoded = capabilities[
+            "base64_encoded"
+        ]
+        result = execute_rcon(ip_address, port, password, "Info")
+        logging.info("Cached RCON Connection Result: %s", result)
+        if "Unknown command" in result:
+            # The server changed its encoding, negotiate again
+            forget_capabilities(ip_address, port, password)
+            capabilities = None
+            result = None
+        elif not any(error in result for error in INFO_ERRORS):
+            if time.monotonic() - capabilities["checked"] > CAPABILITIES_TTL:
+                with server_capabilities_lock:
+                    # Keep other connects from starting another check
+                    capabilities["checked"] = time.monotonic()
+                revalidate_capabilities(ip_address, port, password)
+    if result is None:
+        result, capabilities = negotiate_capabilities(
+            ip_address, port, password
+        )
+        if capabilities is not None:
+            with server_capabilities_lock:
+                server_capabilities[key] = capabilities
+
+    if capabilities is not None:
+        app_settings.localserver.base64_encoded = capabilities[
+            "base64_encoded"
+        ]
+        app_settings.localserver.palguard_installed = capabilities[
+            "palguard_installed"
+        ]
+        if capabilities["palguard_installed"]:
+            reply["palguard_commands"] = list(
+                capabilities["palguard_commands"]
+            )
 
     if "Failed to execute command" in result:
         reply["status"] = "error"
@@ -195,8 +454,9 @@ def rcon_connect(ip_address, port, password, skip_save: bool = False) -> dict:
         app_settings.localserver.connected = True
         reply["status"] = "success"
         reply["message"] = "RCON Connected!"
-        reply["server_name"] = result.split("]")[1].strip()
-        reply["server_version"] = result.split("[")[1].split("]")[0].strip()
+        server_info = parse_info(result)
+        reply["server_name"] = server_info.name
+        reply["server_version"] = server_info.version
         reply["palguard_installed"] = (
             app_settings.localserver.palguard_installed
         )
@@ -216,6 +476,11 @@ def rcon_connect(ip_address, port, password, skip_save: bool = False) -> dict:
     return reply
 
 
+def rcon_disconnect(ip_address, port, password) -> None:
+    """Close the pooled connections to the RCON server."""
+    close_connections(ip_address, port, password)
+
+
 def rcon_fetch_players(ip_address, port, password) -> dict:
     """Fetch the list of players currently connected to the server."""
     log = False
@@ -230,22 +495,17 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
             player.pop("authenticated", None)
         if "kick_reason" in player:
             player.pop("kick_reason", None)
-    result_queue = Queue()
-    app_settings.localserver.last_online_players.sort(
-        key=lambda x: x["steamid"]
-    )
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(ip_address, port, password, "ShowPlayers", result_queue),
+    result = execute_rcon(
+        ip_address,
+        port,
+        password,
+        "ShowPlayers",
+        priority=PRIORITY_MONITORING,
     )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
-
-    # Retrieve the result from the queue
-    result = result_queue.get()
     reply = {}
 
     if "Failed to decode base64" in result:
+        forget_capabilities(ip_address, port, password)
         rcon_connect(ip_address, port, password, skip_save=True)
         return {
             "status": "error",
@@ -256,86 +516,68 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
     # expect "name,playeruid,steamid"
     if log:
         logging.info("Fetch Players Result:\n%s", result)
-    if "name,playeruid,steamid" in result:
+    online_players = showplayers_parser.parse(result)
+    if online_players is not None:
         reply["status"] = "success"
         reply["message"] = "Players fetched successfully"
-        # Use first line of results as the header, and the rest as the player list
-        players = result.split("\n")[1:]
-        # Each row is a player, with PlayerName, PlayerUID, and SteamID separated by commas
-        player_list = []
+        player_list = [player.to_dict() for player in online_players]
         players_joined = []
         players_left = []
         auto_kicked_players = []
-        for player in players:
-            player_data = player.split(",")
-            player_info = {
-                "name": player_data[0],
-                "playeruid": player_data[1],
-                "steamid": player_data[2],
-                # "saveid": hex(int(player_data[1]))[2:].upper(),
-                "saveid": player_data[1],
-                "online": True,
-            }
-            player_list.append(player_info)
+        players_to_kick = []
 
-        # Create a copy of player_list
-        second_player_list = player_list.copy()
         # Drop from second player list any players whose playeruid is all 0s
-        for player in player_list:
-            if player["playeruid"] == "00000000000000000000000000000000":
-                second_player_list.remove(player)
+        second_player_list = [
+            player
+            for player in player_list
+            if player["playeruid"] != EMPTY_PLAYER_UID
+        ]
 
         app_settings.localserver.online_players = second_player_list
-        app_settings.localserver.online_players.sort(
-            key=lambda x: x["steamid"]
-        )
+        # Index both player lists by steamid, so joins and leaves are found
+        # with set operations instead of comparing every pair of players
+        last_online_steamids = {
+            player["steamid"]
+            for player in app_settings.localserver.last_online_players
+        }
+        online_steamids = {
+            player["steamid"]
+            for player in app_settings.localserver.online_players
+        }
         # Check if last_online_players is different from online_players
         # which means a player joined or left
-        if (
-            app_settings.localserver.last_online_players
-            != app_settings.localserver.online_players
-        ):
-            # Check any players that were in the last_online_players list
-            # but not in the online_players list. These are players who left the server
+        if last_online_steamids != online_steamids:
+            # Players who were online last time but aren't anymore left
             players_left = [
                 player
                 for player in app_settings.localserver.last_online_players
-                if player not in app_settings.localserver.online_players
+                if player["steamid"] not in online_steamids
             ]
-            # Check any players that were in the online_players list,
-            # but not in the last_online_players list.
-            # These are players who joined the server
+            # Players who are online now but weren't last time joined
             players_joined = [
                 player
                 for player in app_settings.localserver.online_players
-                if player not in app_settings.localserver.last_online_players
+                if player["steamid"] not in last_online_steamids
             ]
             for player in players_left:
                 logging.info("Player Left: %s", player)
                 # update player status to false in app_settings.localserver.all_players
-                for all_player in app_settings.localserver.all_players:
-                    if all_player["steam_id"] == player["steamid"]:
-                        all_player["online"] = False
+                app_settings.localserver.all_players.update(
+                    player["steamid"], online=False
+                )
+            # Get every joined player's IP using RCON in one round trip
+            player_ips = {}
+            if app_settings.localserver.palguard_installed and players_joined:
+                player_ips = fetch_player_ips(
+                    ip_address,
+                    port,
+                    password,
+                    [player["steamid"] for player in players_joined],
+                )
             for player in players_joined:
                 player_kicked = False
                 if app_settings.localserver.palguard_installed:
-                    # Get player's IP using RCON
-                    get_ip_result_queue = Queue()
-                    command_thread = threading.Thread(
-                        target=execute_rcon,
-                        args=(
-                            ip_address,
-                            port,
-                            password,
-                            f"getip {player['steamid']}",
-                            get_ip_result_queue,
-                        ),
-                    )
-                    command_thread.start()
-                    command_thread.join()  # Wait for the thread to complete
-                    # Retrieve the result from the queue
-                    get_ip_result: str = get_ip_result_queue.get()
-                    player_ip = get_ip_result.split(" ")[-1].strip()
+                    player_ip = player_ips[player["steamid"]]
                     player["ip"] = player_ip
                 # logging.info("Player: %s", player)
                 # logging.info(
@@ -347,17 +589,13 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
                     #     "All Players: %s", app_settings.localserver.all_players
                     # )
                     # Get player from all_players list using steamid
-                    player_exists = [
-                        all_player
-                        for all_player in app_settings.localserver.all_players
-                        if all_player["steam_id"] == player["steamid"]
-                    ]
+                    player_exists = app_settings.localserver.all_players.get(
+                        player["steamid"]
+                    )
                     # logging.info("Player Exists: %s", player_exists)
                     if player_exists:
                         # Check if the player is steam_authenticated
-                        is_authenticated = player_exists[0][
-                            "steam_authenticated"
-                        ]
+                        is_authenticated = player_exists.steam_authenticated
                         if is_authenticated:
                             if app_settings.localserver.enforce_steam_auth_ip:
                                 # Check if Palguard is installed so getip can be used
@@ -373,15 +611,12 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
                                     )
                                 else:
                                     if (
-                                        player_exists[0]["steam_auth_ip"]
+                                        player_exists.steam_auth_ip
                                         != player_ip
                                     ):
-                                        # Kick player using RCON
-                                        rcon_kick_player(
-                                            ip_address,
-                                            port,
-                                            password,
-                                            player["steamid"],
+                                        # Kick player using RCON, below
+                                        players_to_kick.append(
+                                            player["steamid"]
                                         )
                                         player["kick_reason"] = (
                                             "SteamAuth IP Mismatch"
@@ -394,10 +629,8 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
                                         )
                                         player_kicked = True
                         else:
-                            # Kick player using RCON
-                            rcon_kick_player(
-                                ip_address, port, password, player["steamid"]
-                            )
+                            # Kick player using RCON, below
+                            players_to_kick.append(player["steamid"])
                             player["kick_reason"] = "Not Authenticated"
                             auto_kicked_players.append(player)
                             # Remove the player from the second_player_list
@@ -406,10 +639,8 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
                             player_kicked = True
 
                     else:
-                        # Kick player using RCON
-                        rcon_kick_player(
-                            ip_address, port, password, player["steamid"]
-                        )
+                        # Kick player using RCON, below
+                        players_to_kick.append(player["steamid"])
                         player["kick_reason"] = (
                             "Not Found in Database, therefore no SteamAuth available"
                         )
@@ -422,44 +653,35 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
                 # Check if a player exists in app_settings.localserver.all_players,
                 # with a matching steamid. if not, add the joined player,
                 # to the all_players list
-                if player["steamid"] not in [
-                    all_player["steam_id"]
-                    for all_player in app_settings.localserver.all_players
-                ]:
-                    app_settings.localserver.all_players.append(
-                        {
-                            "steam_id": player["steamid"],
-                            "steam_authenticated": False,
-                            "steam_auth_ip": "",
-                            "online": True,
-                            "name": player["name"],
-                            "player_id": player["playeruid"],
-                            "save_id": player["saveid"],
-                            "first_login": datetime.now(),
-                            "whitelisted": False,
-                            "whitelisted_ip": "",
-                            "banned": False,
-                            "is_admin": False,
-                        }
-                    )
-                # Player is already in the all_players list, update their status to True
-                else:
-                    for all_player in app_settings.localserver.all_players:
-                        if all_player["steam_id"] == player["steamid"]:
-                            all_player["online"] = True
-                            all_player["name"] = player["name"]
-                            all_player["player_id"] = player["playeruid"]
-                            all_player["save_id"] = player["saveid"]
-                            all_player["first_login"] = (
-                                datetime.now()
-                                if all_player["first_login"] is None
-                                else all_player["first_login"]
-                            )
+                all_player = app_settings.localserver.all_players.get(
+                    player["steamid"]
+                )
+                app_settings.localserver.all_players.update(
+                    player["steamid"],
+                    create=True,
+                    online=True,
+                    name=player["name"],
+                    player_id=player["playeruid"],
+                    save_id=player["saveid"],
+                    first_login=(
+                        datetime.now()
+                        if all_player is None or all_player.first_login is None
+                        else all_player.first_login
+                    ),
+                )
+            # Kick every player who failed SteamAuth in one batch
+            if players_to_kick:
+                rcon_kick_players(
+                    ip_address,
+                    port,
+                    password,
+                    players_to_kick,
+                    priority=PRIORITY_ENFORCEMENT,
+                    source="enforcement",
+                )
 
         # Update the last_seen time for all players currently online
-        for player in app_settings.localserver.all_players:
-            if player["online"]:
-                player["last_seen"] = datetime.now()
+        app_settings.localserver.all_players.touch_online(datetime.now())
         # logging.info("All Players: %s", app_settings.localserver.all_players)
 
         reply["player_count"] = len(player_list)
@@ -470,8 +692,9 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
             reply["players_joined"] = players_joined
         if len(auto_kicked_players) > 0:
             reply["auto_kicked_players"] = auto_kicked_players
-    elif "Failed to execute command" in result:
+    elif isinstance(result, CommandFailure):
         reply["status"] = "error"
+        reply["error"] = result.failure
         reply["message"] = (
             f'Connection Error: {result.split(":")[1].strip().capitalize()}'
         )
@@ -479,6 +702,7 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
         reply["players"] = []
     else:
         reply["status"] = "error"
+        reply["error"] = FAILURE_ERROR
         reply["message"] = "Connection Error"
         reply["player_count"] = 0
         reply["players"] = []
@@ -486,26 +710,8 @@ def rcon_fetch_players(ip_address, port, password) -> dict:
     return reply
 
 
-def rcon_kick_player(ip_address, port, password, player_steamid) -> dict:
-    """Kick the player with the specified SteamID from the server."""
-    result_queue = Queue()
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(
-            ip_address,
-            port,
-            password,
-            f"KickPlayer steam_{player_steamid}",
-            result_queue,
-        ),
-    )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
-
-    # Retrieve the result from the queue
-    result = result_queue.get()
-    info = f"RCON Kick Player Result: {result}"
-    logging.info(info)
+def kick_reply(result: str) -> dict:
+    """Turn the result of a KickPlayer command into a reply."""
     reply = {}
     if "Failed to execute command" in result:
         reply["status"] = "error"
@@ -520,26 +726,8 @@ def rcon_kick_player(ip_address, port, password, player_steamid) -> dict:
     return reply
 
 
-def rcon_ban_player(ip_address, port, password, player_steamid) -> dict:
-    """Ban the player with the specified SteamID from the server."""
-    result_queue = Queue()
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(
-            ip_address,
-            port,
-            password,
-            f"BanPlayer steam_{player_steamid}",
-            result_queue,
-        ),
-    )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
-
-    # Retrieve the result from the queue
-    result = result_queue.get()
-    info = f"RCON Ban Player Result: {result}"
-    logging.info(info)
+def ban_reply(result: str) -> dict:
+    """Turn the result of a BanPlayer command into a reply."""
     reply = {}
     if "Failed to execute command" in result:
         reply["status"] = "error"
@@ -554,18 +742,118 @@ def rcon_ban_player(ip_address, port, password, player_steamid) -> dict:
     return reply
 
 
-def rcon_save(ip_address, port, password) -> dict:
-    """Save the server state."""
-    result_queue = Queue()
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(ip_address, port, password, "Save", result_queue),
+def run_player_batch(
+    ip_address,
+    port,
+    password,
+    command,
+    steamids,
+    make_reply,
+    priority,
+    source,
+) -> dict:
+    """Run a player command for every SteamID in one pipelined batch."""
+    results = execute_rcon_many(
+        ip_address,
+        port,
+        password,
+        [f"{command} steam_{steamid}" for steamid in steamids],
+        priority=priority,
+        source=source,
+    )
+    players = {}
+    for steamid, result in zip(steamids, results):
+        logging.info("RCON %s %s Result: %s", command, steamid, result)
+        players[steamid] = make_reply(result)
+    succeeded = sum(
+        player["status"] == "success" for player in players.values()
+    )
+    return {
+        "status": "success" if succeeded == len(players) else "error",
+        "message": f"{command} succeeded for {succeeded}/{len(players)} players",
+        "players": players,
+    }
+
+
+def rcon_kick_players(
+    ip_address,
+    port,
+    password,
+    player_steamids: list,
+    priority: int = PRIORITY_ADMIN,
+    source: str = "admin",
+) -> dict:
+    """
+    Kick several players over one connection.
+
+    Args:
+        player_steamids (list): The SteamIDs of the players to kick.
+        priority (int): The scheduling priority of the kicks.
+        source (str): Where the kicks come from, for the command history.
+
+    Returns:
+        dict: The overall status and message, and the reply for each
+            player under "players", by SteamID.
+    """
+    return run_player_batch(
+        ip_address,
+        port,
+        password,
+        "KickPlayer",
+        list(player_steamids),
+        kick_reply,
+        priority,
+        source,
     )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
 
-    # Retrieve the result from the queue
-    result = result_queue.get()
+
+def rcon_ban_players(
+    ip_address,
+    port,
+    password,
+    player_steamids: list,
+    priority: int = PRIORITY_ADMIN,
+    source: str = "admin",
+) -> dict:
+    """
+    Ban several players over one connection.
+
+    Args:
+        player_steamids (list): The SteamIDs of the players to ban.
+        priority (int): The scheduling priority of the bans.
+        source (str): Where the bans come from, for the command history.
+
+    Returns:
+        dict: The overall status and message, and the reply for each
+            player under "players", by SteamID.
+    """
+    return run_player_batch(
+        ip_address,
+        port,
+        password,
+        "BanPlayer",
+        list(player_steamids),
+        ban_reply,
+        priority,
+        source,
+    )
+
+
+def rcon_kick_player(ip_address, port, password, player_steamid) -> dict:
+    """Kick the player with the specified SteamID from the server."""
+    reply = rcon_kick_players(ip_address, port, password, [player_steamid])
+    return reply["players"][player_steamid]
+
+
+def rcon_ban_player(ip_address, port, password, player_steamid) -> dict:
+    """Ban the player with the specified SteamID from the server."""
+    reply = rcon_ban_players(ip_address, port, password, [player_steamid])
+    return reply["players"][player_steamid]
+
+
+def rcon_save(ip_address, port, password) -> dict:
+    """Save the server state."""
+    result = execute_rcon(ip_address, port, password, "Save", source="admin")
     info = f"RCON Save Result: {result}"
     logging.info(info)
     reply = {}
@@ -582,22 +870,13 @@ def rcon_save(ip_address, port, password) -> dict:
 def rcon_shutdown(ip_address, port, password, delay, message) -> dict:
     """Shutdown the server gracefully with the specified delay and message."""
 
-    result_queue = Queue()
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(
-            ip_address,
-            port,
-            password,
-            f"Shutdown {delay} {message}",
-            result_queue,
-        ),
+    result = execute_rcon(
+        ip_address,
+        port,
+        password,
+        f"Shutdown {delay} {message}",
+        source="admin",
     )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
-
-    # Retrieve the result from the queue
-    result = result_queue.get()
     logging.info("RCON Shutdown Result: %s", result)
 
     reply = {}
@@ -611,128 +890,36 @@ def rcon_shutdown(ip_address, port, password, delay, message) -> dict:
                 "Shutting Down Server Process: %s",
                 app_settings.localserver.server_process,
             )
-
-            shutdown_result_queue = Queue()
-
-            def monitor_server_shutdown(result_queue: Queue):
-                """Monitor the server process and wait for it to shut down."""
-                shutdown_timer = 0
-                # Sleep the amount of time specified in the delay before starting the monitoring
-                time.sleep(float(delay))
-                while app_settings.localserver.server_process.poll() is None:
-                    logging.info(
-                        "Waited %s seconds for server to shut down",
-                        shutdown_timer,
-                    )
-                    time.sleep(1)
-                    shutdown_timer += 1
-                    if shutdown_timer > 30:
-                        result_queue.put(False)
-                logging.info("Server has shut down, result placed in queue")
-                result_queue.put(True)
-
-            shutdown_thread = threading.Thread(
-                target=monitor_server_shutdown,
-                args=(shutdown_result_queue,),
-                daemon=True,
-            )
-            shutdown_thread.start()
-            shutdown_result = shutdown_result_queue.get()
-            logging.info("Shutdown Result Queue Received: %s", shutdown_result)
-
-            if shutdown_result:
-                reply["status"] = "success"
-                reply["message"] = "Server shutdown successfully"
-            else:
-                reply["status"] = "error"
-                reply["message"] = (
-                    "Server shutdown command sent successfully, "
-                    + "but shutdown monitor did not detect server shutdown"
-                )
         else:
             # This means the server was not started by Palworld ADMIN
             # Monitor the server shutdown using its PID app_settings.localserver.pid
             logging.info("Shutting down server not started by Palworld ADMIN")
             logging.info("Server PID: %s", app_settings.localserver.pid)
 
-            shutdown_result_queue = Queue()
-
-            def process_exists(pid):
-                """Check if a process exists in a cross-platform manner."""
-                try:
-                    if app_settings.app_os == "Windows":
-                        # Windows-specific method
-                        result = subprocess.check_output(
-                            ["tasklist", "/fi", f"PID eq {pid}"],
-                            stderr=subprocess.STDOUT,
-                            text=True,
-                        )
-                        if "No tasks are running" in result:
-                            return False
-                        else:
-                            return True
-                    else:
-                        # POSIX (Unix, Linux, etc.)
-                        os.kill(int(pid), 0)
-                except (
-                    subprocess.CalledProcessError,
-                    ProcessLookupError,
-                    OSError,
-                ):
-                    return False
-                return True
-
-            def monitor_server_shutdown(result_queue: Queue):
-                """Monitor the server process and wait for it to shut down."""
-                logging.info("Monitoring server shutdown")
-                shutdown_timer = 0
-                while process_exists(app_settings.localserver.pid):
-                    logging.info(
-                        "Waited %s seconds for server to shut down",
-                        shutdown_timer,
-                    )
-                    time.sleep(1)
-                    shutdown_timer += 1
-                    if shutdown_timer > 30:
-                        result_queue.put(False)
-                        break
-                logging.info("Server has shut down, result placed in queue")
-                result_queue.put(True)
-
-            shutdown_thread = threading.Thread(
-                target=monitor_server_shutdown,
-                args=(shutdown_result_queue,),
-                daemon=True,
+        # Wait for the server to exit, up to 30 seconds after the delay
+        shutdown_result = wait_for_process_exit(
+            app_settings.localserver.pid,
+            float(delay) + SHUTDOWN_GRACE_PERIOD,
+            process=app_settings.localserver.server_process,
+        )
+        logging.info("Server shutdown detected: %s", shutdown_result)
+
+        if shutdown_result:
+            reply["status"] = "success"
+            reply["message"] = "Server shutdown successfully"
+        else:
+            reply["status"] = "error"
+            reply["message"] = (
+                "Server shutdown command sent successfully, "
+                + "but shutdown monitor did not detect server shutdown"
             )
-            shutdown_thread.start()
-            shutdown_result = shutdown_result_queue.get()
-            logging.info("Shutdown Result Queue Received: %s", shutdown_result)
-
-            if shutdown_result:
-                reply["status"] = "success"
-                reply["message"] = "Server shutdown successfully"
-            else:
-                reply["status"] = "error"
-                reply["message"] = (
-                    "Server shutdown command sent successfully, "
-                    + "but shutdown monitor did not detect server shutdown"
-                )
 
     return reply
 
 
 def rcon_doexit(ip_address, port, password) -> dict:
     """Shutdown the server."""
-    result_queue = Queue()
-    command_thread = threading.Thread(
-        target=execute_rcon,
-        args=(ip_address, port, password, "DoExit", result_queue),
-    )
-    command_thread.start()
-    command_thread.join()  # Wait for the thread to complete
-
-    # Retrieve the result from the queue
-    result = result_queue.get()
+    result = execute_rcon(ip_address, port, password, "DoExit", source="admin")
     info = f"RCON DoExit Result: {result}"
     logging.info(info)
     reply = {}
@@ -744,3 +931,272 @@ def rcon_doexit(ip_address, port, password) -> dict:
         reply["message"] = "Server shutdown initiated successfully"
 
     return reply
+
+
+def fan_out(
+    servers: list,
+    commands,
+    timeout: float = 10.0,
+    priority: int = PRIORITY_ADMIN,
+) -> dict:
+    """
+    Send commands to several servers at once and wait for all of them.
+
+    Every server has its own pooled connection and scheduler queue, so
+    the servers are handled concurrently and the whole fan-out takes about
+    as long as the slowest server.
+
+    Args:
+        servers (list): The RconServers to send the commands to.
+        commands (list or callable): The commands to send, or a function
+            returning the commands for a server.
+        timeout (float): Seconds to wait for the responses.
+        priority (int): The scheduling priority of the commands.
+
+    Returns:
+        dict: The stripped response of each command, by server name.
+    """
+    futures = {}
+    for server in servers:
+        server_commands = (
+            commands(server) if callable(commands) else list(commands)
+        )
+        futures[server.name] = (
+            submit_commands(
+                server.host_port,
+                server.password,
+                server_commands,
+                base64_encoded=server.base64_encoded,
+                timeout=timeout,
+                priority=priority,
+            ),
+            len(server_commands),
+        )
+    # Leave the connections their own timeout before giving up on the loop
+    wait([future for future, _ in futures.values()], timeout=timeout + 5)
+    results = {}
+    for name, (future, count) in futures.items():
+        if future.done() and not future.cancelled():
+            results[name] = [
+                strip_result(result) for result in future.result()
+            ]
+        else:
+            future.cancel()
+            results[name] = [
+                CommandFailure("Timed out", FAILURE_TIMEOUT)
+            ] * count
+    return results
+
+
+def aggregate_replies(action: str, replies: dict) -> dict:
+    """Combine the reply of each server into one reply."""
+    succeeded = sum(reply["status"] == "success" for reply in replies.values())
+    return {
+        "status": "success" if succeeded == len(replies) else "error",
+        "message": f"{action} succeeded on {succeeded}/{len(replies)} servers",
+        "servers": replies,
+    }
+
+
+def selected_servers(names: list = None) -> list:
+    """Return the registered servers with the given names, or all of them."""
+    if names is None:
+        return list(rcon_servers)
+    return [rcon_servers.get(name) for name in names if name in rcon_servers]
+
+
+def rcon_connect_servers(names: list = None) -> dict:
+    """
+    Negotiate the encoding and PalGuard support of several servers at once.
+
+    Returns:
+        dict: The overall status and message, and the reply of each server
+            under "servers", by name.
+    """
+    servers = selected_servers(names)
+    results = {}
+    pending = servers
+    for base64_encoded in (False, True):
+        for server in pending:
+            # Unknown until negotiated, so a base64 answer is still detected
+            server.base64_encoded = base64_encoded or None
+        results.update(fan_out(pending, ["Info", "getrconcmds"]))
+        # Servers that didn't know the plain commands take base64
+        pending = [
+            server
+            for server in pending
+            if "Unknown command" in results[server.name][0]
+        ]
+        if not pending:
+            break
+
+    replies = {}
+    for server in servers:
+        server.base64_encoded = bool(server.base64_encoded)
+        result, commands_result = results[server.name]
+        if any(error in result for error in INFO_ERRORS):
+            server.connected = False
+            server.message = f"Connection Error: {result}"
+            replies[server.name] = {
+                "status": "error",
+                "error": getattr(result, "failure", FAILURE_ERROR),
+                "message": server.message,
+            }
+            continue
+        capabilities = capabilities_from(
+            result, commands_result, server.base64_encoded
+        )
+        with server_capabilities_lock:
+            server_capabilities[
+                (server.host, str(server.port), server.password)
+            ] = capabilities
+        server.palguard_installed = capabilities["palguard_installed"]
+        server.server_name = capabilities["server_name"]
+        server.server_version = capabilities["server_version"]
+        server.connected = True
+        server.message = "RCON Connected!"
+        replies[server.name] = {
+            "status": "success",
+            "message": server.message,
+            "server": server.to_dict(),
+        }
+    return aggregate_replies("Connect", replies)
+
+
+def rcon_broadcast_servers(
+    message: str, command: str = "broadcast", names: list = None
+) -> dict:
+    """Broadcast a message, or run a custom command, on several servers."""
+    servers = [
+        server for server in selected_servers(names) if server.connected
+    ]
+
+    def broadcast_command(server):
+        if command == "broadcast" and server.palguard_installed:
+            return [f"pgbroadcast {message}"]
+        if command == "custom":
+            return [message]
+        return [f"{command} {message}"]
+
+    start = time.perf_counter()
+    results = fan_out(servers, broadcast_command)
+    duration = time.perf_counter() - start
+    replies = {}
+    for server in servers:
+        result = results[server.name][0]
+        record_commands(
+            "admin",
+            [f"[{server.name}] {broadcast_command(server)[0]}"],
+            [result],
+            duration,
+        )
+        if "Failed to execute command" in result:
+            replies[server.name] = {
+                "status": "error",
+                "message": f"Error: {result}",
+            }
+        elif "Unknown command" in result:
+            replies[server.name] = {
+                "status": "error",
+                "message": "Unknown command",
+            }
+        else:
+            replies[server.name] = {"status": "success", "message": result}
+    return aggregate_replies("Broadcast", replies)
+
+
+def rcon_save_servers(names: list = None) -> dict:
+    """Save the world of several servers at once."""
+    servers = [
+        server for server in selected_servers(names) if server.connected
+    ]
+    start = time.perf_counter()
+    results = fan_out(servers, ["Save"])
+    duration = time.perf_counter() - start
+    replies = {}
+    for server in servers:
+        result = results[server.name][0]
+        record_commands("admin", [f"[{server.name}] Save"], [result], duration)
+        if "Failed to execute command" in result:
+            replies[server.name] = {"status": "error", "message": "Save Error"}
+        else:
+            replies[server.name] = {
+                "status": "success",
+                "message": "Game saved successfully",
+            }
+    return aggregate_replies("Save", replies)
+
+
+def rcon_fetch_players_servers(
+    servers: list = None, priority: int = PRIORITY_MONITORING
+) -> dict:
+    """
+    Fetch the player lists of several servers at once.
+
+    Args:
+        servers (list, optional): The RconServers to poll, every connected
+            server by default.
+        priority (int): The scheduling priority of the polls.
+
+    Returns:
+        dict: The overall status and message, the total player count, and
+            the players of each server under "servers", by name.
+    """
+    if servers is None:
+        servers = [server for server in rcon_servers if server.connected]
+    results = fan_out(servers, ["ShowPlayers"], priority=priority)
+    replies = {}
+    for server in servers:
+        result = results[server.name][0]
+        players = server.showplayers_parser.parse(result)
+        if players is None:
+            server.message = f"Connection Error: {result}"
+            replies[server.name] = {
+                "status": "error",
+                "error": getattr(result, "failure", FAILURE_ERROR),
+                "message": server.message,
+                "player_count": 0,
+                "players": [],
+            }
+            continue
+        server.players = players
+        replies[server.name] = {
+            "status": "success",
+            "message": "Players fetched successfully",
+            "player_count": len(players),
+            "players": [player.to_dict() for player in players],
+        }
+    reply = aggregate_replies("Fetch players", replies)
+    reply["player_count"] = sum(
+        reply["player_count"] for reply in replies.values()
+    )
+    return reply
+
+
+def register_server(
+    name: str,
+    host: str,
+    port: int,
+    password: str,
+    monitor_interval: float = 5.0,
+) -> RconServer:
+    """
+    Add a server to the registry, replacing one with the same name.
+
+    Raises:
+        ValueError: If a server with another name uses the same host and
+            port.
+    """
+    server = RconServer(name, host, port, password, monitor_interval)
+    replaced = rcon_servers.add(server)
+    if replaced is not None:
+        close_connections(replaced.host, replaced.port, replaced.password)
+    return server
+
+
+def unregister_server(name: str) -> RconServer:
+    """Remove a server from the registry and close its connection."""
+    server = rcon_servers.remove(name)
+    if server is not None:
+        close_connections(server.host, server.port, server.password)
+    return server
@@ -0,0 +1,362 @@
+"""Load and latency benchmarks for the RCON client, against the mock server.
+
+Run it as a script, next to rcon.py, so the client is imported without
+loading the app settings through the palworld_admin.rcon package:
+    python palworld_admin/rcon/benchmark.py --players 32 --latency 0.001
+
+The fetch-players and monitor scenarios follow rcon_fetch_players and the
+server monitor: a ShowPlayers poll parsed by ShowPlayersParser, the joins
+and leaves applied to a PlayerRegistry, plus one pipelined getip batch
+for the players who joined since the last poll.
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# fmt: off
+from mockserver import MockRconServer                               # pylint: disable=import-error
+from rcon import (                                                  # pylint: disable=import-error
+    close_connections,
+    execute,
+    execute_many,
+    rcon_scheduler,
+)
+from parsers import (                                               # pylint: disable=import-error
+    EMPTY_PLAYER_UID,
+    ShowPlayersParser,
+    parse_getip,
+)
+# fmt: on
+
+# Loaded from its file, since the classes package imports the app
+_registry_spec = importlib.util.spec_from_file_location(
+    "playerregistry",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "classes",
+        "playerregistry.py",
+    ),
+)
+_registry_module = importlib.util.module_from_spec(_registry_spec)
+_registry_spec.loader.exec_module(_registry_module)
+PlayerRegistry = _registry_module.PlayerRegistry
+
+PASSWORD = "benchmark"
+WRONG_PASSWORD = "not-the-password"
+
+
+class BenchmarkResult:
+    """Timings of one benchmark scenario."""
+
+    def __init__(self, name: str):
+        """
+        Initialize a BenchmarkResult object.
+
+        Args:
+            name (str): The name of the scenario.
+        """
+        self.name = name
+        self.latencies: list[float] = []
+        self.commands = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.connections = 0
+
+    def percentile(self, percent: float) -> float:
+        """Return a latency percentile in milliseconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index] * 1000
+
+    def report(self) -> str:
+        """Return a one line summary of the scenario."""
+        rate = self.commands / self.elapsed if self.elapsed else 0.0
+        mean = statistics.fmean(self.latencies) * 1000 if self.latencies else 0
+        return (
+            f"{self.name:<16} {self.commands:>7} cmds {rate:>10.1f} cmds/s"
+            f"  mean {mean:7.2f} ms  p50 {self.percentile(50):7.2f} ms"
+            f"  p99 {self.percentile(99):7.2f} ms"
+            f"  errors {self.errors}  connections {self.connections}"
+        )
+
+
+def failed(response: str) -> bool:
+    return response.startswith("Failed to execute command")
+
+
+def bench_execute(
+    server: MockRconServer, requests: int, concurrency: int, base64: bool
+) -> BenchmarkResult:
+    """Send single Info commands from several threads at once."""
+    result = BenchmarkResult("execute")
+    host_port = f"{server.host}:{server.port}"
+    lock = threading.Lock()
+
+    def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            response = execute(
+                host_port, PASSWORD, "Info", base64_encoded=base64
+            )
+            latency = time.perf_counter() - start
+            with lock:
+                result.latencies.append(latency)
+                result.commands += 1
+                result.errors += failed(response)
+
+    connections = server.connections
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        share, rest = divmod(requests, concurrency)
+        for index in range(concurrency):
+            pool.submit(worker, share + (index < rest))
+    result.elapsed = time.perf_counter() - start
+    result.connections = server.connections - connections
+    return result
+
+
+def bench_auth_failure(
+    server: MockRconServer, requests: int
+) -> BenchmarkResult:
+    """Send Info with a wrong password, which must fail to authenticate.
+
+    Every attempt opens a new connection. Errors count the attempts that
+    were not rejected as an authentication failure.
+    """
+    result = BenchmarkResult("auth-failure")
+    host_port = f"{server.host}:{server.port}"
+    connections = server.connections
+    start = time.perf_counter()
+    for _ in range(requests):
+        # Drop the failure the pool remembers, so each attempt logs in
+        close_connections(server.host, server.port, WRONG_PASSWORD)
+        attempt = time.perf_counter()
+        response = execute(host_port, WRONG_PASSWORD, "Info")
+        result.latencies.append(time.perf_counter() - attempt)
+        result.commands += 1
+        result.errors += "Authentication failed" not in response
+    result.elapsed = time.perf_counter() - start
+    result.connections = server.connections - connections
+    return result
+
+
+class PlayerTracker:
+    """The player list state rcon_fetch_players keeps between polls."""
+
+    def __init__(self):
+        """Initialize a PlayerTracker object."""
+        self.parser = ShowPlayersParser()
+        self.all_players = PlayerRegistry()
+        self.online_players: list = []
+
+
+def fetch_players_tick(
+    host_port: str,
+    tracker: PlayerTracker,
+    base64: bool,
+    result: BenchmarkResult,
+) -> None:
+    """Poll ShowPlayers and look up the IPs of new players, like the app."""
+    start = time.perf_counter()
+    response = execute(
+        host_port, PASSWORD, "ShowPlayers", base64_encoded=base64
+    )
+    result.commands += 1
+    online_players = (
+        None if failed(response) else tracker.parser.parse(response)
+    )
+    if online_players is None:
+        result.errors += 1
+    else:
+        last_online_players = tracker.online_players
+        tracker.online_players = [
+            player.to_dict()
+            for player in online_players
+            if player.playeruid != EMPTY_PLAYER_UID
+        ]
+        last_online_steamids = {
+            player["steamid"] for player in last_online_players
+        }
+        online_steamids = {
+            player["steamid"] for player in tracker.online_players
+        }
+        if last_online_steamids != online_steamids:
+            for player in last_online_players:
+                if player["steamid"] not in online_steamids:
+                    tracker.all_players.update(player["steamid"], online=False)
+            players_joined = [
+                player
+                for player in tracker.online_players
+                if player["steamid"] not in last_online_steamids
+            ]
+            if players_joined:
+                responses = execute_many(
+                    host_port,
+                    PASSWORD,
+                    [
+                        f"getip {player['steamid']}"
+                        for player in players_joined
+                    ],
+                    base64_encoded=base64,
+                )
+                result.commands += len(players_joined)
+                for player, response in zip(players_joined, responses):
+                    player["ip"] = parse_getip(response)
+                    if player["ip"] is None:
+                        result.errors += 1
+                    tracker.all_players.update(
+                        player["steamid"],
+                        create=True,
+                        online=True,
+                        name=player["name"],
+                        player_id=player["playeruid"],
+                        save_id=player["saveid"],
+                    )
+    result.latencies.append(time.perf_counter() - start)
+
+
+def bench_fetch_players(
+    server: MockRconServer, requests: int, churn: int, base64: bool
+) -> BenchmarkResult:
+    """Poll the player list back to back while players join and leave."""
+    result = BenchmarkResult("fetch-players")
+    host_port = f"{server.host}:{server.port}"
+    tracker = PlayerTracker()
+    connections = server.connections
+    start = time.perf_counter()
+    for _ in range(requests):
+        if churn:
+            server.remove_players(churn)
+            server.add_players(churn)
+        fetch_players_tick(host_port, tracker, base64, result)
+    result.elapsed = time.perf_counter() - start
+    result.connections = server.connections - connections
+    return result
+
+
+def bench_monitor(
+    server: MockRconServer,
+    duration: float,
+    interval: float,
+    churn: int,
+    base64: bool,
+) -> BenchmarkResult:
+    """Run the monitor's poll loop at its interval for a while."""
+    result = BenchmarkResult("monitor")
+    host_port = f"{server.host}:{server.port}"
+    tracker = PlayerTracker()
+    connections = server.connections
+    start = time.perf_counter()
+    next_tick = start
+    while time.perf_counter() - start < duration:
+        if churn:
+            server.remove_players(churn)
+            server.add_players(churn)
+        fetch_players_tick(host_port, tracker, base64, result)
+        next_tick += interval
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    result.elapsed = time.perf_counter() - start
+    result.connections = server.connections - connections
+    return result
+
+
+def parse_cli():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="RCON client benchmarks")
+    parser.add_argument(
+        "-n", "--players", type=int, default=32, help="Players online"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="Commands per scenario"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Threads for execute"
+    )
+    parser.add_argument(
+        "--churn", type=int, default=2, help="Players replaced per poll"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="Monitor seconds"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=1.0, help="Monitor poll seconds"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Server seconds per command"
+    )
+    parser.add_argument(
+        "--fragment",
+        type=int,
+        default=0,
+        help="Largest server write in bytes, 0 sends whole packets",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Scheduler commands/s per server, 0 turns the limit off",
+    )
+    parser.add_argument(
+        "--base64", action="store_true", help="Use base64 commands"
+    )
+    parser.add_argument(
+        "--scenario",
+        choices=["all", "execute", "fetch-players", "monitor", "auth-failure"],
+        default="all",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the selected scenarios against a fresh mock server."""
+    args = parse_cli()
+    rcon_scheduler.rate = args.rate
+    server = MockRconServer(
+        password=PASSWORD,
+        players=args.players,
+        base64_mode=args.base64,
+        palguard=True,
+        latency=args.latency,
+        fragment_size=args.fragment,
+    )
+    server.start()
+    try:
+        if args.scenario in ("all", "execute"):
+            print(
+                bench_execute(
+                    server, args.requests, args.concurrency, args.base64
+                ).report()
+            )
+        if args.scenario in ("all", "fetch-players"):
+            print(
+                bench_fetch_players(
+                    server, args.requests, args.churn, args.base64
+                ).report()
+            )
+        if args.scenario in ("all", "auth-failure"):
+            print(bench_auth_failure(server, args.requests // 10).report())
+        if args.scenario in ("all", "monitor"):
+            print(
+                bench_monitor(
+                    server,
+                    args.duration,
+                    args.interval,
+                    args.churn,
+                    args.base64,
+                ).report()
+            )
+    finally:
+        close_connections()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
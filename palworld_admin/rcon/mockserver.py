@@ -0,0 +1,301 @@
+"""Local stand-in for a Palworld RCON server, for testing and benchmarks.
+
+It only uses the standard library, so it runs without the app:
+    python palworld_admin/rcon/mockserver.py --port 25575 --password admin
+        --players 32 --palguard --latency 0.005
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import struct
+import threading
+import time
+
+# Palworld splits long responses into packets with bodies of this size
+SPLIT_BODY_SIZE = 4086
+
+
+class MockRconServer:
+    """Speaks the Source RCON framing the way a Palworld server does.
+
+    The server runs on its own event loop thread, so blocking code can
+    start it, point RCON clients at it and read its counters.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        password: str = "admin",
+        players: int = 0,
+        base64_mode: bool = False,
+        palguard: bool = False,
+        latency: float = 0.0,
+        fragment_size: int = 0,
+    ):
+        """
+        Initialize a MockRconServer object.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on, 0 picks a free one.
+            password (str): The RCON password clients must authenticate with.
+            players (int): The number of synthetic players online.
+            base64_mode (bool): Expect base64 commands and send base64
+                responses, like servers with base64 RCON enabled.
+            palguard (bool): Answer the PalGuard commands getrconcmds and
+                getip.
+            latency (float): Seconds to wait before answering each command.
+            fragment_size (int): Send responses in writes of at most this
+                many bytes, to exercise partial reads. 0 sends whole packets.
+        """
+        self.host = host
+        self.port = port
+        self.password = password
+        self.base64_mode = base64_mode
+        self.palguard = palguard
+        self.latency = latency
+        self.fragment_size = fragment_size
+        self.players: list[tuple[str, str, str]] = []
+        self.next_player = 0
+        self.add_players(players)
+
+        self.loop: asyncio.AbstractEventLoop = None
+        self.server: asyncio.AbstractServer = None
+        self.thread: threading.Thread = None
+        self.handlers: set[asyncio.Task] = set()
+
+        # Counters
+        self.connections = 0
+        self.open_connections = 0
+        self.auth_failures = 0
+        self.commands = 0
+
+    def add_players(self, count: int) -> None:
+        """Add synthetic players to the ShowPlayers output."""
+        for _ in range(count):
+            index = self.next_player
+            self.next_player += 1
+            self.players.append(
+                (f"Player{index}", f"{index + 1:032X}", f"7656{index:013d}")
+            )
+
+    def remove_players(self, count: int) -> None:
+        """Remove the players that joined first."""
+        del self.players[:count]
+
+    def start(self) -> int:
+        """
+        Start serving on a background thread.
+
+        Returns:
+            int: The port the server listens on.
+        """
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle, self.host, self.port)
+            )
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(
+            target=run, name="mock-rcon-server", daemon=True
+        )
+        self.thread.start()
+        ready.wait()
+        return self.port
+
+    def stop(self) -> None:
+        """Stop serving and close every connection."""
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            self.server.close()
+            for handler in self.handlers:
+                handler.cancel()
+            await asyncio.gather(*self.handlers, return_exceptions=True)
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+
+    async def handle(self, reader, writer):
+        """Serve one client connection until it disconnects."""
+        self.connections += 1
+        self.open_connections += 1
+        self.handlers.add(asyncio.current_task())
+        authenticated = False
+        try:
+            while True:
+                size = struct.unpack("<i", await reader.readexactly(4))[0]
+                packet = await reader.readexactly(size)
+                reqid, cmd_type = struct.unpack_from("<ii", packet)
+                body = packet[8:].rstrip(b"\x00").decode("utf-8", "ignore")
+
+                if cmd_type == 3:  # cmdAuth
+                    authenticated = body == self.password
+                    if not authenticated:
+                        # Like the real server: answer with request ID -1
+                        # and drop the connection
+                        self.auth_failures += 1
+                        await self.send(writer, packet_for(-1, 2))
+                        break
+                    await self.send(writer, packet_for(reqid, 2))
+                    continue
+                if not authenticated:
+                    # Commands before a successful login are refused
+                    self.auth_failures += 1
+                    break
+                if cmd_type == 0:  # Empty sentinel, mirrored back
+                    await self.send(writer, packet_for(reqid, 0))
+                    continue
+
+                self.commands += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                await self.send_response(writer, reqid, self.answer(body))
+        except (
+            asyncio.CancelledError,
+            asyncio.IncompleteReadError,
+            ConnectionError,
+        ):
+            pass
+        finally:
+            self.handlers.discard(asyncio.current_task())
+            self.open_connections -= 1
+            writer.close()
+
+    def answer(self, body: str) -> str:
+        """Return the response to a command."""
+        if self.base64_mode:
+            try:
+                body = base64.b64decode(body, validate=True).decode("utf-8")
+            except (binascii.Error, UnicodeDecodeError):
+                return self.encode("Unknown command")
+        command, _, argument = body.partition(" ")
+        command = command.lower()
+        response = "Unknown command"
+        if command == "info":
+            response = "Welcome to Pal Server[v0.2.4.0] Mock Palworld Server"
+        elif command == "showplayers":
+            response = "name,playeruid,steamid\n" + "\n".join(
+                ",".join(player) for player in self.players
+            )
+        elif command == "save":
+            response = "Complete Save"
+        elif command in ("broadcast", "pgbroadcast"):
+            response = f"Broadcasted: {argument}"
+        elif command == "kickplayer":
+            if self.is_online(argument):
+                response = f"Kicked: {argument}"
+            else:
+                response = f"Failed to Kick: {argument}"
+        elif command == "banplayer":
+            if self.is_online(argument):
+                response = f"Baned: {argument}"
+            else:
+                response = f"Failed to Ban: {argument}"
+        elif command == "shutdown":
+            response = f"The server will shut down in {argument}"
+        elif command == "doexit":
+            response = "Shutdown Server"
+        elif self.palguard and command == "getrconcmds":
+            response = (
+                "getip:<steamid>;pgbroadcast:<message>;"
+                "give:<steamid> <item> <count>;give_exp:<steamid> <amount>"
+            )
+        elif self.palguard and command == "getip":
+            index = sum(int(digit) for digit in argument if digit.isdigit())
+            response = f"IP of {argument}: 10.0.{index % 256}.{len(argument)}"
+        return self.encode(response)
+
+    def is_online(self, player: str) -> bool:
+        """Return whether a player, given as steam_<steamid>, is online."""
+        steamid = player[len("steam_") :]
+        return any(online[2] == steamid for online in self.players)
+
+    def encode(self, response: str) -> str:
+        if self.base64_mode:
+            return base64.b64encode(response.encode("utf-8")).decode("utf-8")
+        return response
+
+    async def send_response(self, writer, reqid: int, response: str):
+        """Send a response, split into packets like the real server does."""
+        data = response.encode("utf-8")
+        chunks = [
+            data[start : start + SPLIT_BODY_SIZE]
+            for start in range(0, len(data), SPLIT_BODY_SIZE)
+        ] or [b""]
+        for chunk in chunks:
+            await self.send(writer, packet_for(reqid, 0, chunk))
+
+    async def send(self, writer, packet: bytes):
+        if not self.fragment_size:
+            writer.write(packet)
+            await writer.drain()
+            return
+        for start in range(0, len(packet), self.fragment_size):
+            writer.write(packet[start : start + self.fragment_size])
+            await writer.drain()
+
+
+def packet_for(reqid: int, packet_type: int, body: bytes = b"") -> bytes:
+    """Build an RCON packet, including its size field."""
+    header = struct.pack("<iii", 10 + len(body), reqid, packet_type)
+    return header + body + b"\x00\x00"
+
+
+def parse_cli():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Mock Palworld RCON server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=25575)
+    parser.add_argument("-P", "--password", default="admin")
+    parser.add_argument(
+        "-n", "--players", type=int, default=0, help="Players online"
+    )
+    parser.add_argument(
+        "--base64", action="store_true", help="Use base64 commands"
+    )
+    parser.add_argument(
+        "--palguard", action="store_true", help="Answer PalGuard commands"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per command"
+    )
+    parser.add_argument(
+        "--fragment",
+        type=int,
+        default=0,
+        help="Largest write in bytes, 0 sends whole packets",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli()
+    mock_server = MockRconServer(
+        host=args.host,
+        port=args.port,
+        password=args.password,
+        players=args.players,
+        base64_mode=args.base64,
+        palguard=args.palguard,
+        latency=args.latency,
+        fragment_size=args.fragment,
+    )
+    print(f"Mock RCON server listening on {args.host}:{mock_server.start()}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock_server.stop()
@@ -0,0 +1,208 @@
+"""Parsers for the responses of the RCON commands the app relies on.
+
+Each parser turns the text of a response into typed records, using
+patterns compiled once at import. They only use the standard library, so
+they can be imported next to rcon.py as well as through the package.
+"""
+
+import ipaddress
+import re
+from typing import Optional
+
+# Info: "Welcome to Pal Server[v0.2.4.0] My Server Name"
+INFO_PATTERN = re.compile(r"\[(?P<version>[^\]]*)\](?P<name>.*)", re.DOTALL)
+
+# ShowPlayers header row
+SHOWPLAYERS_HEADER = "name,playeruid,steamid"
+
+# ShowPlayers row. The name is greedy, so names containing commas keep
+# them and the last two fields are always the IDs.
+PLAYER_ROW_PATTERN = re.compile(
+    r"^(?P<name>.*),(?P<playeruid>[^,\n]*),(?P<steamid>[^,\n]*?)\r?$",
+    re.MULTILINE,
+)
+
+# The last token of a getip response, which holds the address
+GETIP_PATTERN = re.compile(r"(\S+)\s*$")
+
+# getrconcmds entry: "name:<arguments>", separated by semicolons
+RCON_COMMAND_PATTERN = re.compile(r"(?P<name>[^:;]+):?(?P<args>[^;]*)")
+
+# A player that hasn't finished loading in yet
+EMPTY_PLAYER_UID = "00000000000000000000000000000000"
+
+
+class ServerInfo:
+    """The server name and version, from Info."""
+
+    __slots__ = ("name", "version")
+
+    def __init__(self, name: str, version: str):
+        self.name = name
+        self.version = version
+
+
+class OnlinePlayer:
+    """One row of ShowPlayers."""
+
+    __slots__ = ("name", "playeruid", "steamid")
+
+    def __init__(self, name: str, playeruid: str, steamid: str):
+        self.name = name
+        self.playeruid = playeruid
+        self.steamid = steamid
+
+    def to_dict(self) -> dict:
+        """Return the player in the format sent to the frontend."""
+        return {
+            "name": self.name,
+            "playeruid": self.playeruid,
+            "steamid": self.steamid,
+            "saveid": self.playeruid,
+            "online": True,
+        }
+
+
+class PalGuardCommand:
+    """One command listed by PalGuard's getrconcmds."""
+
+    __slots__ = ("name", "args")
+
+    def __init__(self, name: str, args: str):
+        self.name = name
+        self.args = args
+
+    def to_dict(self) -> dict:
+        """Return the command in the format sent to the frontend."""
+        return {"name": self.name, "args": self.args}
+
+
+def parse_info(response: str) -> ServerInfo:
+    """
+    Parse the response of Info.
+
+    Args:
+        response (str): The response text.
+
+    Returns:
+        ServerInfo: The server name and version. A response without a
+            bracketed version is used as the name, with version "N/A".
+    """
+    match = INFO_PATTERN.search(response)
+    if match is None:
+        return ServerInfo(response.strip(), "N/A")
+    return ServerInfo(
+        match.group("name").strip(), match.group("version").strip()
+    )
+
+
+def parse_showplayers(response: str) -> Optional[tuple]:
+    """
+    Parse the response of ShowPlayers.
+
+    Args:
+        response (str): The response text.
+
+    Returns:
+        tuple: The OnlinePlayer of each row, or None if the response
+            doesn't start with the ShowPlayers header.
+    """
+    header, _, rows = response.partition("\n")
+    if SHOWPLAYERS_HEADER not in header:
+        return None
+    return tuple(
+        OnlinePlayer(*match.groups())
+        for match in PLAYER_ROW_PATTERN.finditer(rows)
+    )
+
+
+def parse_getip(response: str) -> Optional[str]:
+    """
+    Parse the response of PalGuard's getip.
+
+    Args:
+        response (str): The response text.
+
+    Returns:
+        str: The IPv4 or IPv6 address of the player, without a port, or
+            None if the response doesn't end with one.
+    """
+    match = GETIP_PATTERN.search(response)
+    if match is None:
+        return None
+    token = match.group(1)
+    candidates = [token]
+    if token.count(":") == 1:
+        # IPv4 address with a port
+        candidates.append(token.split(":")[0])
+    elif token.startswith("[") and "]" in token:
+        # Bracketed IPv6 address, with or without a port
+        candidates.append(token[1 : token.index("]")])
+    for candidate in candidates:
+        try:
+            ipaddress.ip_address(candidate)
+        except ValueError:
+            continue
+        # As written by PalGuard, to compare with the SteamAuth IP
+        return candidate
+    return None
+
+
+def parse_rcon_commands(response: str) -> list:
+    """
+    Parse the response of PalGuard's getrconcmds.
+
+    Args:
+        response (str): The response text.
+
+    Returns:
+        list: The PalGuardCommand of each entry, sorted like the raw
+            entries. Entries without arguments get empty args.
+    """
+    entries = sorted(
+        entry.strip() for entry in response.split(";") if entry.strip()
+    )
+    commands = []
+    for entry in entries:
+        match = RCON_COMMAND_PATTERN.match(entry)
+        if match is not None:
+            commands.append(
+                PalGuardCommand(match.group("name"), match.group("args"))
+            )
+    return commands
+
+
+class ShowPlayersParser:
+    """Parses ShowPlayers responses, skipping unchanged ones.
+
+    The monitor polls ShowPlayers every few seconds and the player list
+    rarely changes between polls, so the records of the last response are
+    reused while the response is identical.
+    """
+
+    def __init__(self):
+        """Initialize a ShowPlayersParser object."""
+        # (response, players), replaced as a whole so concurrent callers
+        # never see the players of another response
+        self.last: tuple = (None, None)
+
+    def parse(self, response: str) -> Optional[tuple]:
+        """
+        Parse a ShowPlayers response, see parse_showplayers().
+
+        Returns:
+            tuple: The OnlinePlayer of each row, or None if the response
+                isn't a player list.
+        """
+        last_response, last_players = self.last
+        # Comparing the text is a length check plus a memcmp, cheaper than
+        # hashing it and without collisions
+        if response == last_response:
+            return last_players
+        players = parse_showplayers(response)
+        self.last = (response, players)
+        return players
+
+    def reset(self) -> None:
+        """Forget the last response."""
+        self.last = (None, None)
@@ -1,19 +1,78 @@
 """Basic RCON client for servers."""
 
 import argparse
+import asyncio
 import base64
+import binascii
+import bisect
+import heapq
+import ipaddress
+import itertools
 import platform
 import re
+import select
 import socket
 import struct
 import sys
 import threading
+import time
+from concurrent.futures import Future
 
 SECTION_SIGN = "§"
 RESET = "\u001B[0m"
 
-# Regex for IPv4 addresses
-IPV4_PATTERN = r"^(\d{1,3}\.){3}\d{1,3}$"
+# Sanity limit for the size field of a response packet
+MAX_PACKET_SIZE = 16 * 1024 * 1024
+
+# Servers split long responses into packets with bodies of this size
+SPLIT_BODY_SIZE = 4086
+
+# Seconds to wait for the next packet of a response after a full packet.
+# A response of an exact multiple of SPLIT_BODY_SIZE ends on a full packet,
+# so without a sentinel only the silence that follows tells it apart.
+SPLIT_CONTINUATION_TIMEOUT = 0.2
+
+# Response encodings. Auto detects the encoding from the first response of a
+# connection and keeps using it for the rest of the connection.
+ENCODING_PLAIN = "plain"
+ENCODING_BASE64 = "base64"
+ENCODING_AUTO = "auto"
+
+# Kinds of CommandFailure, from the exception that failed the command
+FAILURE_REFUSED = "refused"
+FAILURE_RESET = "reset"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_NETWORK = "network"
+FAILURE_ERROR = "error"
+
+# Failures that mean the server isn't reachable at all
+OFFLINE_FAILURES = (FAILURE_REFUSED, FAILURE_RESET, FAILURE_NETWORK)
+
+# Scheduling priorities, most urgent first
+PRIORITY_ADMIN = 0
+PRIORITY_ENFORCEMENT = 1
+PRIORITY_MONITORING = 2
+
+# Commands whose pending duplicates share a single execution
+COALESCED_COMMANDS = {"showplayers", "save"}
+
+# Upper bounds, in seconds, of the command duration histogram buckets
+DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Commands with their own metrics, any others are counted as "other"
+MAX_METRIC_COMMANDS = 64
 
 # Regex for domain names (simplified version)
 DOMAIN_PATTERN = r"^([a-z0-9]+(-[a-z0-9]+)*\.)+([a-z]{2,})$"
@@ -48,10 +107,77 @@ class RconError(Exception):
     """Custom exception class for RCON errors."""
 
 
+class RconTimeoutError(RconError):
+    """Raised when the server doesn't answer a command in time."""
+
+
+class CommandResponse(str):
+    """The response of a command, with the seconds it took to arrive.
+
+    Commands pipelined in one batch each get their own duration, from
+    sending the command to receiving the last packet of its response.
+    """
+
+    def __new__(cls, data: str, duration: float):
+        """
+        Create a CommandResponse.
+
+        Args:
+            data (str): The decoded response.
+            duration (float): Seconds from sending the command to its whole
+                response.
+        """
+        response = super().__new__(cls, data)
+        response.duration = duration
+        return response
+
+    def strip(self, chars=None):
+        """Strip the response, keeping its duration."""
+        return CommandResponse(super().strip(chars), self.duration)
+
+
+class CommandFailure(str):
+    """The result of a command that failed, in place of its response.
+
+    It reads like the "Failed to execute command: ..." text that callers
+    already check for, and carries the kind of failure so callers don't
+    have to parse the message, which differs between platforms.
+    """
+
+    def __new__(cls, error, failure: str = None):
+        """
+        Create a CommandFailure.
+
+        Args:
+            error (Exception or str): The error that failed the command.
+            failure (str, optional): The kind of failure, classified from
+                the error by default.
+        """
+        result = super().__new__(cls, f"Failed to execute command: {error}")
+        result.failure = failure or classify_error(error)
+        return result
+
+
+def classify_error(error) -> str:
+    """Return the kind of failure an exception stands for."""
+    if isinstance(error, ConnectionRefusedError):
+        return FAILURE_REFUSED
+    if isinstance(error, (ConnectionResetError, ConnectionAbortedError)):
+        return FAILURE_RESET
+    # TimeoutError is an OSError, and asyncio's is an alias of it
+    if isinstance(
+        error, (TimeoutError, asyncio.TimeoutError, RconTimeoutError)
+    ):
+        return FAILURE_TIMEOUT
+    if isinstance(error, OSError):
+        return FAILURE_NETWORK
+    return FAILURE_ERROR
+
+
 class RemoteConsole:
     """Class to establish and manage a remote console connection."""
 
-    def __init__(self, host, port, password):
+    def __init__(self, host, port, password, encoding=ENCODING_AUTO):
         """
         Initialize a RemoteConsole object.
 
@@ -59,6 +185,8 @@ class RemoteConsole:
             host (str): The host (IP address or hostname) of the RCON server.
             port (int): The port of the RCON server.
             password (str): The RCON password for authentication.
+            encoding (str): The response encoding, ENCODING_PLAIN,
+                ENCODING_BASE64 or ENCODING_AUTO.
 
         Raises:
             RconError: If authentication fails or there is an issue with the connection.
@@ -66,6 +194,9 @@ class RemoteConsole:
         self.conn = socket.create_connection((host, port), timeout=10)
         self.lock = threading.Lock()
         self.reqid = 0x7FFFFFFF
+        self.encoding = encoding
+        # Reused for every read, grown when a larger packet arrives
+        self.buffer = bytearray(4096)
 
         # Authenticate
         if not self._authenticate(password):
@@ -87,8 +218,9 @@ class RemoteConsole:
         Returns:
             bool: True if authentication is successful, False otherwise.
         """
-        # Use a distinct request ID for authentication, separate from regular command IDs
-        auth_reqid = -1  # Or any other suitable constant or unique value
+        # The server answers a failed login with request ID -1, so the
+        # login itself must use a request ID that can't be -1
+        auth_reqid = self._new_request_id()
         self._write_cmd(
             3, password, auth_reqid
         )  # cmdAuth = 3, sending with auth_reqid
@@ -148,22 +280,49 @@ class RemoteConsole:
         Returns:
             int: The request ID for the sent command.
         """
-        if len(cmd_str) > 1024 - 10:
-            raise RconError("Command too long")
-
         if reqid is None:
             reqid = self._new_request_id()
 
-        packet = struct.pack("<iii", 10 + len(cmd_str), reqid, cmd_type)
-        # The original ascii encoding, try utf-8 instead
-        packet += cmd_str.encode("utf-8") + b"\x00\x00"
-        # packet += cmd_str.encode("ascii") + b"\x00\x00"
+        packet = encode_packet(cmd_type, cmd_str, reqid)
 
         with self.lock:
             self.conn.sendall(packet)
 
         return reqid
 
+    def _recv_exactly(self, size):
+        """
+        Fill the first size bytes of the receive buffer from the socket.
+
+        Returns:
+            memoryview: A view of the received bytes in the buffer.
+        """
+        if size > len(self.buffer):
+            self.buffer = bytearray(size)
+        view = memoryview(self.buffer)[:size]
+        received = 0
+        while received < size:
+            count = self.conn.recv_into(view[received:], size - received)
+            if count == 0:
+                raise RconError("Incomplete response")
+            received += count
+        return view
+
+    def _read_packet(self):
+        """
+        Read exactly one packet from the RCON server.
+
+        Returns:
+            tuple: The response type, request ID and raw body of the packet.
+        """
+        with self.lock:
+            # Read packet length (first 4 bytes)
+            size = struct.unpack_from("<i", self._recv_exactly(4))[0]
+            check_packet_size(size)
+
+            # Read the rest of the packet
+            return decode_packet(self._recv_exactly(size))
+
     def _read_response(self):
         """
         Read the response from the RCON server.
@@ -171,45 +330,1066 @@ class RemoteConsole:
         Returns:
             tuple: A tuple containing the response type, request ID, and response data.
         """
+        resp_type, reqid, body = self._read_packet()
+        chunks = [body]
+        # A full packet means the response may continue in the next one
+        while len(chunks[-1]) >= SPLIT_BODY_SIZE:
+            readable, _, _ = select.select(
+                [self.conn], [], [], SPLIT_CONTINUATION_TIMEOUT
+            )
+            if not readable:
+                break
+            chunks.append(self._read_packet()[2])
+        data, self.encoding = decode_response(b"".join(chunks), self.encoding)
+        return resp_type, reqid, data
+
+
+def encode_packet(cmd_type, cmd_str, reqid):
+    """
+    Build an RCON packet.
+
+    Args:
+        cmd_type (int): The command type.
+        cmd_str (str): The command string.
+        reqid (int): The request ID.
+
+    Returns:
+        bytes: The packet, including its size field.
+    """
+    if len(cmd_str) > 1024 - 10:
+        raise RconError("Command too long")
+
+    packet = struct.pack("<iii", 10 + len(cmd_str), reqid, cmd_type)
+    # The original ascii encoding, try utf-8 instead
+    packet += cmd_str.encode("utf-8") + b"\x00\x00"
+    # packet += cmd_str.encode("ascii") + b"\x00\x00"
+    return packet
+
+
+def check_packet_size(size):
+    """Raise an RconError if a packet size field can't be right."""
+    if size < 10 or size > MAX_PACKET_SIZE:
+        raise RconError("Invalid response size")
+
+
+def decode_packet(packet):
+    """
+    Split a packet, without its size field, into its parts.
+
+    Returns:
+        tuple: The response type, request ID and raw body of the packet.
+    """
+    reqid, resp_type = struct.unpack_from("<ii", packet)
+    # Drop the two terminating null bytes
+    body = bytes(packet[8:]).rstrip(b"\x00")
+    return resp_type, reqid, body
+
+
+def decode_base64(body):
+    """Return the text of a base64 encoded body, or None if it isn't one."""
+    try:
+        text = base64.b64decode(body, validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    # Plain replies made only of base64 characters decode to binary noise
+    if not all(char.isprintable() or char.isspace() for char in text):
+        return None
+    return text
+
+
+def decode_response(body, encoding=ENCODING_AUTO):
+    """
+    Decode a response body exactly once.
+
+    Args:
+        body (bytes): The complete response body.
+        encoding (str): ENCODING_PLAIN, ENCODING_BASE64 or ENCODING_AUTO.
+
+    Returns:
+        tuple: The decoded response and the encoding to use for the next
+            response of the connection. Auto stays auto until a non-empty
+            response has been seen.
+    """
+    if encoding != ENCODING_PLAIN and body:
+        text = decode_base64(body)
+        if text is not None:
+            return text, ENCODING_BASE64
+        if encoding == ENCODING_AUTO:
+            encoding = ENCODING_PLAIN
+    # Original ascii decoding, try utf-8 instead
+    return body.decode("utf-8", errors="ignore"), encoding
+
+
+class AsyncRemoteConsole:
+    """asyncio RCON connection that multiplexes commands by request ID.
+
+    A reader task matches each response to the future of its request, so
+    several commands can be in flight on one connection at once.
+    """
+
+    def __init__(
+        self, host, port, password, use_sentinel=False, encoding=ENCODING_AUTO
+    ):
+        """
+        Initialize an AsyncRemoteConsole object. Call connect() to open it.
+
+        Args:
+            host (str): The host (IP address or hostname) of the RCON server.
+            port (int): The port of the RCON server.
+            password (str): The RCON password for authentication.
+            use_sentinel (bool): Follow each command with an empty response
+                packet, which the server mirrors once it has sent the whole
+                response. Only for servers that support it, otherwise split
+                responses are detected by packet size.
+            encoding (str): The default response encoding, see submit().
+        """
+        self.host = host
+        self.port = port
+        self.password = password
+        self.use_sentinel = use_sentinel
+        self.encoding = encoding
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+        self.reader_task: asyncio.Task = None
+        self.reqid = 0x7FFFFFFF
+        self.last_used = time.monotonic()
+        self.closed = False
+        self.pending: dict[int, asyncio.Future] = {}
+        # Request ID -> response encoding requested for it
+        self.encodings: dict[int, str] = {}
+        # Received bodies of responses that span several packets
+        self.partial: dict[int, list[bytes]] = {}
+        # Sentinel request ID -> request ID of the command it follows
+        self.sentinels: dict[int, int] = {}
+        # Without sentinels, the request ID whose last packet was full,
+        # and the timer that ends its response if nothing follows
+        self.continued: int = None
+        self.continuation_timer: asyncio.TimerHandle = None
+        # Request ID -> (command name, send time, bytes sent), for the
+        # duration of each response and the metrics
+        self.timings: dict[int, tuple[str, float, int]] = {}
+
+    async def connect(self, timeout=10.0):
+        """
+        Open the connection and authenticate.
+
+        Raises:
+            RconError: If the host can't be resolved or authentication
+                fails.
+        """
+        address = await asyncio.wait_for(
+            rcon_resolver.resolve(self.host), timeout
+        )
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(address, self.port), timeout
+        )
+        try:
+            # A failed login is answered with request ID -1
+            auth_reqid = self._new_request_id()
+            self.writer.write(
+                encode_packet(3, self.password, auth_reqid)
+            )  # cmdAuth = 3
+            await self.writer.drain()
+            resp_type, resp_reqid, _ = await asyncio.wait_for(
+                self._read_packet(), timeout
+            )
+            if resp_type != 2 or resp_reqid != auth_reqid:
+                raise RconError("Authentication failed")
+        except BaseException:
+            self.close()
+            raise
+        self.reader_task = asyncio.get_running_loop().create_task(
+            self._reader_loop()
+        )
+
+    def close(self):
+        """Close the connection and fail every pending command."""
+        self.closed = True
+        if self.writer is not None:
+            self.writer.close()
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+
+    def is_alive(self):
+        """Return whether the connection is open and its reader is running."""
+        return (
+            not self.closed
+            and self.reader_task is not None
+            and not self.reader_task.done()
+        )
+
+    def _new_request_id(self):
+        self.reqid = (self.reqid + 1) & 0x0FFFFFFF
+        return self.reqid
+
+    def submit(self, cmd, encoding=ENCODING_AUTO, name=None):
+        """
+        Send a command without waiting for its response.
+
+        Args:
+            cmd (str): The command to send.
+            encoding (str): The response encoding. ENCODING_AUTO uses the
+                encoding negotiated by the first response of the connection.
+            name (str, optional): The command name to record the duration
+                and size of the command under, in rcon_metrics.
+
+        Returns:
+            asyncio.Future: Resolves to the (type, request ID, data) response,
+                with the data as a CommandResponse.
+        """
+        if self.closed:
+            raise RconError("Connection closed")
+        reqid = self._new_request_id()
+        packet = encode_packet(2, cmd, reqid)  # cmdExecCommand = 2
+        if self.use_sentinel:
+            sentinel_reqid = self._new_request_id()
+            self.sentinels[sentinel_reqid] = reqid
+            # respResponseValue = 0
+            packet += encode_packet(0, "", sentinel_reqid)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[reqid] = future
+        if encoding != ENCODING_AUTO:
+            self.encodings[reqid] = encoding
+        self.timings[reqid] = (name, time.perf_counter(), len(packet))
+        self.last_used = time.monotonic()
+        self.writer.write(packet)
+        return future
+
+    async def execute_many(
+        self, commands, timeout=10.0, encoding=ENCODING_AUTO, names=None
+    ):
+        """
+        Send several commands at once and wait for all of their responses.
+
+        Args:
+            commands (list): The commands to send.
+            timeout (float): Seconds to wait for the whole batch.
+            encoding (str): The response encoding, see submit().
+            names (list, optional): The metrics name of each command, see
+                submit().
+
+        Returns:
+            list: The (type, request ID, data) response of each command.
+        """
+        names = names or [None] * len(commands)
+        futures = [
+            self.submit(command, encoding, name)
+            for command, name in zip(commands, names)
+        ]
+        try:
+            await self.writer.drain()
+            return await asyncio.wait_for(asyncio.gather(*futures), timeout)
+        except asyncio.TimeoutError as e:
+            raise RconTimeoutError("Timed out waiting for a response") from e
+        finally:
+            for reqid, future in list(self.pending.items()):
+                if future in futures:
+                    del self.pending[reqid]
+                    self.encodings.pop(reqid, None)
+                    self.timings.pop(reqid, None)
+                    self.partial.pop(reqid, None)
+
+    async def _read_packet(self):
+        try:
+            size = struct.unpack("<i", await self.reader.readexactly(4))[0]
+            check_packet_size(size)
+            return decode_packet(await self.reader.readexactly(size))
+        except asyncio.IncompleteReadError as e:
+            raise RconError("Incomplete response") from e
+
+    async def _reader_loop(self):
+        """Read responses and resolve the future waiting for each one."""
+        error = RconError("Connection closed")
+        try:
+            while True:
+                resp_type, reqid, body = await self._read_packet()
+                command_reqid = self.sentinels.pop(reqid, None)
+                if command_reqid is not None:
+                    self._finish_response(resp_type, command_reqid)
+                    continue
+                if self.use_sentinel:
+                    self.partial.setdefault(reqid, []).append(body)
+                    continue
+                # Responses arrive in order, so a packet of another request
+                # ends the split response before it
+                if self.continued is not None and self.continued != reqid:
+                    self._end_continuation(resp_type)
+                self.partial.setdefault(reqid, []).append(body)
+                if len(body) < SPLIT_BODY_SIZE:
+                    if self.continued == reqid:
+                        self._cancel_continuation()
+                    self._finish_response(resp_type, reqid)
+                else:
+                    self._cancel_continuation()
+                    self.continued = reqid
+                    self.continuation_timer = (
+                        asyncio.get_running_loop().call_later(
+                            SPLIT_CONTINUATION_TIMEOUT,
+                            self._end_continuation,
+                            resp_type,
+                        )
+                    )
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:  # pylint: disable=broad-except
+            if not self.closed:
+                error = e
+        finally:
+            self.closed = True
+            self._cancel_continuation()
+            if self.writer is not None:
+                self.writer.close()
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+            self.encodings.clear()
+            self.partial.clear()
+            self.sentinels.clear()
+            self.timings.clear()
+
+    def _cancel_continuation(self):
+        """Stop waiting for the next packet of a split response."""
+        if self.continuation_timer is not None:
+            self.continuation_timer.cancel()
+            self.continuation_timer = None
+        self.continued = None
+
+    def _end_continuation(self, resp_type):
+        """End the split response whose last packet was full."""
+        reqid = self.continued
+        self._cancel_continuation()
+        if reqid is not None:
+            self._finish_response(resp_type, reqid)
+
+    def _finish_response(self, resp_type, reqid):
+        """Decode a complete response and resolve the future waiting for it."""
+        packets = self.partial.pop(reqid, [])
+        body = b"".join(packets)
+        future = self.pending.pop(reqid, None)
+        encoding = self.encodings.pop(reqid, None)
+        timing = self.timings.pop(reqid, None)
+        if future is None or future.done():
+            return
+        name, sent_at, bytes_sent = timing
+        duration = time.perf_counter() - sent_at
+        if name is not None:
+            rcon_metrics.record_command(
+                name,
+                duration,
+                bytes_sent,
+                # Each packet has 14 bytes of size, ID, type and padding
+                len(body) + 14 * len(packets),
+            )
+        if encoding is None:
+            data, self.encoding = decode_response(body, self.encoding)
+        else:
+            data, _ = decode_response(body, encoding)
+        future.set_result((resp_type, reqid, CommandResponse(data, duration)))
+
+
+class RconConnectionPool:
+    """Shared, authenticated RCON connections.
+
+    There is one multiplexed connection per (host, port, password), shared
+    by every caller, instead of connecting and authenticating for every
+    command. Connections are health checked before reuse, and failed
+    connection attempts back off exponentially so an unreachable server
+    isn't hammered. All methods run on the RCON event loop.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 300.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        use_sentinel: bool = False,
+    ):
+        """
+        Initialize a RconConnectionPool object.
+
+        Args:
+            idle_timeout (float): Seconds after which an unused connection is
+                replaced instead of reused.
+            backoff_base (float): Seconds to wait after the first failed
+                connection attempt, doubled on every further failure.
+            backoff_max (float): The longest wait between connection attempts.
+            use_sentinel (bool): Detect the end of split responses with an
+                empty sentinel packet, see AsyncRemoteConsole.
+        """
+        self.idle_timeout = idle_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.use_sentinel = use_sentinel
+        self.connections: dict[tuple, AsyncRemoteConsole] = {}
+        self.connect_locks: dict[tuple, asyncio.Lock] = {}
+        # key -> (consecutive failures, retry time, last error)
+        self.failures: dict[tuple, tuple[int, float, Exception]] = {}
+
+    def _healthy(self, remote_console):
+        if remote_console is None:
+            return False
+        idle_for = time.monotonic() - remote_console.last_used
+        return idle_for <= self.idle_timeout and remote_console.is_alive()
+
+    async def connection(self, host, port, password):
+        """
+        Return the shared connection to a server, connecting if needed.
+
+        Returns:
+            tuple: The connection and whether it was already open.
+
+        Raises:
+            Exception: The connection error, or the last one while backing off.
+        """
+        key = (host, int(port), password)
+        remote_console = self.connections.get(key)
+        if self._healthy(remote_console):
+            return remote_console, True
+
+        connect_lock = self.connect_locks.setdefault(key, asyncio.Lock())
+        async with connect_lock:
+            # Another caller may have reconnected while we waited
+            remote_console = self.connections.get(key)
+            if self._healthy(remote_console):
+                return remote_console, True
+            reconnect = remote_console is not None
+            if reconnect:
+                remote_console.close()
+            failure = self.failures.get(key)
+            if failure and time.monotonic() < failure[1]:
+                raise failure[2]
+            remote_console = AsyncRemoteConsole(
+                host, port, password, self.use_sentinel
+            )
+            try:
+                await remote_console.connect()
+            except Exception as e:
+                rcon_metrics.record_connection(reconnect, e)
+                count = failure[0] + 1 if failure else 1
+                delay = min(
+                    self.backoff_max, self.backoff_base * 2 ** (count - 1)
+                )
+                self.failures[key] = (count, time.monotonic() + delay, e)
+                raise
+            rcon_metrics.record_connection(reconnect)
+            self.failures.pop(key, None)
+            self.connections[key] = remote_console
+        return remote_console, False
+
+    async def execute_many(
+        self,
+        host,
+        port,
+        password,
+        commands,
+        timeout=10.0,
+        encoding=ENCODING_AUTO,
+        names=None,
+    ):
+        """
+        Send several commands at once and wait for all of their responses.
+
+        The commands are pipelined on one connection, so the batch takes a
+        single round trip. If the shared connection turns out to be broken,
+        it is replaced and the batch is retried once.
+
+        Args:
+            commands (list): The commands to send.
+            timeout (float): Seconds to wait for the whole batch.
+            encoding (str): The response encoding, see
+                AsyncRemoteConsole.submit().
+            names (list, optional): The metrics name of each command.
+
+        Returns:
+            list: The (type, request ID, data) response of each command.
+        """
+        while True:
+            remote_console, reused = await self.connection(
+                host, port, password
+            )
+            try:
+                return await remote_console.execute_many(
+                    commands, timeout, encoding, names
+                )
+            except RconTimeoutError:
+                raise
+            except (OSError, RconError):
+                remote_console.close()
+                if reused:
+                    continue
+                raise
+
+    def close(self, host=None, port=None, password=None):
+        """Close the connection to one server, or to every server."""
+        if host is None:
+            keys = list(self.connections)
+        else:
+            keys = [(host, int(port), password)]
+        for key in keys:
+            self.failures.pop(key, None)
+            remote_console = self.connections.pop(key, None)
+            if remote_console is not None:
+                remote_console.close()
+
+
+class TokenBucket:
+    """Token bucket rate limit, refilled continuously."""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a TokenBucket object.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): The most tokens the bucket holds, which is the
+                largest burst allowed.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, count: float) -> float:
+        """Return the seconds until count tokens are available."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        count = min(count, self.capacity)
+        if self.tokens >= count:
+            return 0.0
+        return (count - self.tokens) / self.rate
+
+    def take(self, count: float) -> None:
+        """Remove tokens, after wait_time returned 0 for them."""
+        self.tokens -= min(count, self.capacity)
+
+
+class RconJob:
+    """Commands waiting in the scheduler for their turn."""
+
+    __slots__ = (
+        "commands",
+        "timeout",
+        "encoding",
+        "future",
+        "names",
+        "dispatched",
+        "waiters",
+    )
+
+    def __init__(self, commands, timeout, encoding, future, names=None):
+        self.commands = commands
+        self.timeout = timeout
+        self.encoding = encoding
+        self.future = future
+        self.names = names
+        self.dispatched = False
+        # Callers still waiting for the result, see cancel_if_abandoned
+        self.waiters = 0
+
+    def cancel_if_abandoned(self) -> bool:
+        """
+        Cancel the job if nobody waits for it and it wasn't sent yet.
+
+        A kick or shutdown that a caller already reported as timed out
+        must not reach the server later.
+
+        Returns:
+            bool: Whether the job was cancelled.
+        """
+        if self.waiters or self.dispatched or self.future.done():
+            return False
+        return self.future.cancel()
+
+
+class RconScheduler:
+    """Orders and rate limits the commands sent to each server.
+
+    Commands are dispatched most urgent first, admin actions before
+    enforcement before monitoring, and each server has a token bucket so
+    bursts from several callers don't flood it. A ShowPlayers or Save
+    that is already waiting is shared with anyone who asks for it again.
+    Runs on the RCON event loop.
+    """
+
+    def __init__(
+        self,
+        pool: RconConnectionPool,
+        rate: float = 20.0,
+        burst: float = 40.0,
+    ):
+        """
+        Initialize a RconScheduler object.
+
+        Args:
+            pool (RconConnectionPool): Sends the dispatched commands.
+            rate (float): Commands per second allowed to each server. 0
+                turns off rate limiting.
+            burst (float): Commands that may be sent at once after a quiet
+                period.
+        """
+        self.pool = pool
+        self.rate = rate
+        self.burst = burst
+        self.counter = itertools.count()
+        self.queues: dict[tuple, list] = {}
+        self.wakeups: dict[tuple, asyncio.Event] = {}
+        self.buckets: dict[tuple, TokenBucket] = {}
+        self.dispatchers: dict[tuple, asyncio.Task] = {}
+        # (server key, command, encoding) -> job waiting to be dispatched
+        self.coalescing: dict[tuple, RconJob] = {}
+
+    async def execute_many(
+        self,
+        host,
+        port,
+        password,
+        commands,
+        timeout=10.0,
+        encoding=ENCODING_AUTO,
+        priority=PRIORITY_ADMIN,
+        coalesce=False,
+        names=None,
+    ):
+        """
+        Queue commands and wait for their responses.
+
+        Args:
+            commands (list): The commands to send, in one pipelined batch.
+            timeout (float): Seconds to wait, including the time queued.
+            encoding (str): The response encoding.
+            priority (int): PRIORITY_ADMIN, PRIORITY_ENFORCEMENT or
+                PRIORITY_MONITORING.
+            coalesce (bool): Share the execution of an identical single
+                command that is still waiting.
+            names (list, optional): The metrics name of each command.
+
+        Returns:
+            list: The (type, request ID, data) response of each command.
+        """
+        key = (host, int(port), password)
+        coalesce_key = (key, commands[0], encoding) if coalesce else None
+        job = self.coalescing.get(coalesce_key) if coalesce else None
+        if job is None:
+            job = RconJob(
+                commands,
+                timeout,
+                encoding,
+                asyncio.get_running_loop().create_future(),
+                names,
+            )
+            # Mark a failure retrieved even if every waiter timed out
+            job.future.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
+            if coalesce:
+                self.coalescing[coalesce_key] = job
+        # A job coalesced with a more urgent request is queued again at
+        # that priority; whichever entry comes first dispatches it
+        heapq.heappush(
+            self.queues.setdefault(key, []),
+            (priority, next(self.counter), job, coalesce_key),
+        )
+        self.wakeups.setdefault(key, asyncio.Event()).set()
+        dispatcher = self.dispatchers.get(key)
+        if dispatcher is None or dispatcher.done():
+            self.dispatchers[key] = asyncio.get_running_loop().create_task(
+                self._dispatch(key)
+            )
+        job.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError as e:
+            raise RconTimeoutError("Timed out waiting for a response") from e
+        finally:
+            # Timed out or cancelled; a coalesced job keeps going while any
+            # other caller still waits for it
+            job.waiters -= 1
+            if job.cancel_if_abandoned():
+                if self.coalescing.get(coalesce_key) is job:
+                    del self.coalescing[coalesce_key]
+
+    async def _dispatch(self, key):
+        """Send the queued jobs of one server in priority order."""
+        queue = self.queues[key]
+        wakeup = self.wakeups[key]
+        while True:
+            while not queue:
+                wakeup.clear()
+                await wakeup.wait()
+            _, _, job, coalesce_key = queue[0]
+            # Skip jobs that were sent already, or abandoned by every caller
+            if job.dispatched or job.future.done():
+                heapq.heappop(queue)
+                continue
+            if self.rate:
+                bucket = self.buckets.get(key)
+                if bucket is None or bucket.rate != self.rate:
+                    bucket = TokenBucket(self.rate, self.burst)
+                    self.buckets[key] = bucket
+                delay = bucket.wait_time(len(job.commands))
+                if delay:
+                    # Wake up early for a new job, which may be more urgent
+                    wakeup.clear()
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                bucket.take(len(job.commands))
+            heapq.heappop(queue)
+            job.dispatched = True
+            if self.coalescing.get(coalesce_key) is job:
+                del self.coalescing[coalesce_key]
+            asyncio.get_running_loop().create_task(self._run(key, job))
+
+    async def _run(self, key, job):
+        try:
+            result = await self.pool.execute_many(
+                *key, job.commands, job.timeout, job.encoding, job.names
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+
+class CommandMetrics:
+    """Duration histogram, traffic and errors of one command name."""
+
+    __slots__ = ("buckets", "count", "total", "sent", "received", "errors")
+
+    def __init__(self, bucket_count: int):
+        # Non-cumulative count per bucket, the last one is +Inf
+        self.buckets = [0] * (bucket_count + 1)
+        self.count = 0
+        self.total = 0.0
+        self.sent = 0
+        self.received = 0
+        # Exception class name -> failed requests
+        self.errors: dict[str, int] = {}
+
+
+class RconMetrics:
+    """In-process registry of RCON client metrics.
+
+    The connections record the duration and size of every command they
+    answer, per command name, the pool records connections and
+    reconnects, and failed requests are counted by exception class.
+    Recorded on the RCON event loop, read from any thread.
+    """
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        """
+        Initialize a RconMetrics object.
+
+        Args:
+            buckets (tuple): Upper bounds, in seconds, of the duration
+                histogram buckets, in increasing order.
+        """
+        self.lock = threading.Lock()
+        self.buckets = buckets
+        self.commands: dict[str, CommandMetrics] = {}
+        self.connections = 0
+        self.reconnects = 0
+        # Exception class name -> failed connection attempts
+        self.connection_errors: dict[str, int] = {}
+
+    def _command(self, name: str) -> CommandMetrics:
+        """Return the metrics of a command name. Call with the lock held."""
+        if name not in self.commands and (
+            len(self.commands) >= MAX_METRIC_COMMANDS
+        ):
+            name = "other"
+        metrics = self.commands.get(name)
+        if metrics is None:
+            metrics = CommandMetrics(len(self.buckets))
+            self.commands[name] = metrics
+        return metrics
+
+    def record_command(
+        self, name: str, duration: float, sent: int, received: int
+    ) -> None:
+        """
+        Record a command that was answered.
+
+        Args:
+            name (str): The command name, see command_name().
+            duration (float): Seconds from sending it to its whole response.
+            sent (int): Bytes sent for the command.
+            received (int): Bytes received for the response.
+        """
         with self.lock:
-            # Read packet length (first 4 bytes)
-            size_data = self.conn.recv(4)
-            if len(size_data) < 4:
-                raise RconError("Incomplete response")
+            metrics = self._command(name)
+            metrics.buckets[bisect.bisect_left(self.buckets, duration)] += 1
+            metrics.count += 1
+            metrics.total += duration
+            metrics.sent += sent
+            metrics.received += received
+
+    def record_error(self, name: str, error: Exception) -> None:
+        """Record a request for a command that failed with an exception."""
+        error_class = type(error).__name__
+        with self.lock:
+            errors = self._command(name).errors
+            errors[error_class] = errors.get(error_class, 0) + 1
 
-            size = struct.unpack("<i", size_data)[0]
-            if size < 10 or size > 4096:
-                raise RconError("Invalid response size")
+    def record_connection(
+        self, reconnect: bool, error: Exception = None
+    ) -> None:
+        """
+        Record a connection attempt.
 
-            # Read the rest of the packet
-            remaining_data = self.conn.recv(size)
-            reqid, resp_type = struct.unpack("<ii", remaining_data[:8])
-
-            # Extract the actual response data
-            # Adjusting the offset here if necessary
-            response = (
-                remaining_data[8:]
-                # Original ascii decoding, try utf-8 instead
-                .decode("utf-8", errors="ignore").rstrip("\x00")
-                # .decode("ascii", errors="ignore").rstrip("\x00")
+        Args:
+            reconnect (bool): Whether it replaces an earlier connection.
+            error (Exception, optional): Why the attempt failed.
+        """
+        with self.lock:
+            if error is not None:
+                error_class = type(error).__name__
+                self.connection_errors[error_class] = (
+                    self.connection_errors.get(error_class, 0) + 1
+                )
+            else:
+                self.connections += 1
+                self.reconnects += reconnect
+
+    def quantile(self, metrics: CommandMetrics, q: float) -> float:
+        """Estimate a duration quantile from the histogram, in seconds."""
+        rank = q * metrics.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, metrics.buckets):
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        """Return the metrics as a dict, for JSON."""
+        with self.lock:
+            commands = {}
+            for name, metrics in sorted(self.commands.items()):
+                cumulative = 0
+                buckets = {}
+                for upper, count in zip(
+                    self.buckets + ("+Inf",), metrics.buckets
+                ):
+                    cumulative += count
+                    buckets[str(upper)] = cumulative
+                commands[name] = {
+                    "count": metrics.count,
+                    "sum": metrics.total,
+                    "mean": (
+                        metrics.total / metrics.count if metrics.count else 0.0
+                    ),
+                    "p50": self.quantile(metrics, 0.5),
+                    "p99": self.quantile(metrics, 0.99),
+                    "buckets": buckets,
+                    "bytes_sent": metrics.sent,
+                    "bytes_received": metrics.received,
+                    "errors": dict(metrics.errors),
+                }
+            return {
+                "commands": commands,
+                "connections": self.connections,
+                "reconnects": self.reconnects,
+                "connection_errors": dict(self.connection_errors),
+            }
+
+    def to_prometheus(self, prefix: str = "palworld_rcon") -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        commands = snapshot["commands"]
+        lines = [
+            f"# HELP {prefix}_command_duration_seconds Time from sending an"
+            " RCON command to its whole response.",
+            f"# TYPE {prefix}_command_duration_seconds histogram",
+        ]
+        for name, metrics in commands.items():
+            label = f'command="{prometheus_label(name)}"'
+            for upper, count in metrics["buckets"].items():
+                lines.append(
+                    f"{prefix}_command_duration_seconds_bucket"
+                    f'{{{label},le="{upper}"}} {count}'
+                )
+            lines.append(
+                f"{prefix}_command_duration_seconds_sum{{{label}}}"
+                f" {metrics['sum']}"
+            )
+            lines.append(
+                f"{prefix}_command_duration_seconds_count{{{label}}}"
+                f" {metrics['count']}"
             )
+        for metric, key, description in (
+            ("bytes_sent_total", "bytes_sent", "Bytes sent for commands."),
+            (
+                "bytes_received_total",
+                "bytes_received",
+                "Bytes received in responses.",
+            ),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {description}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for name, metrics in commands.items():
+                lines.append(
+                    f'{prefix}_{metric}{{command="{prometheus_label(name)}"}}'
+                    f" {metrics[key]}"
+                )
+        lines.append(
+            f"# HELP {prefix}_command_errors_total Failed requests, by"
+            " exception class."
+        )
+        lines.append(f"# TYPE {prefix}_command_errors_total counter")
+        for name, metrics in commands.items():
+            for error, count in sorted(metrics["errors"].items()):
+                lines.append(
+                    f"{prefix}_command_errors_total"
+                    f'{{command="{prometheus_label(name)}",error="{error}"}}'
+                    f" {count}"
+                )
+        for metric, description in (
+            ("connections", "Connections opened."),
+            ("reconnects", "Connections opened to replace an earlier one."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric}_total {description}")
+            lines.append(f"# TYPE {prefix}_{metric}_total counter")
+            lines.append(f"{prefix}_{metric}_total {snapshot[metric]}")
+        lines.append(
+            f"# HELP {prefix}_connection_errors_total Failed connection"
+            " attempts, by exception class."
+        )
+        lines.append(f"# TYPE {prefix}_connection_errors_total counter")
+        for error, count in sorted(snapshot["connection_errors"].items()):
+            lines.append(
+                f'{prefix}_connection_errors_total{{error="{error}"}} {count}'
+            )
+        return "\n".join(lines) + "\n"
 
-            # function for checking if the response is base64 encoded
-            def is_base64_encoded(s):
-                try:
-                    _ = base64.b64decode(s).decode("utf-8")
-                    return True
-                except Exception:  # pylint: disable=broad-except
-                    return False
+    def reset(self) -> None:
+        """Forget every recorded metric."""
+        with self.lock:
+            self.commands.clear()
+            self.connections = 0
+            self.reconnects = 0
+            self.connection_errors.clear()
+
+
+class AddressResolver:
+    """Caches the addresses that RCON host names resolve to.
+
+    Lookups run through the event loop's getaddrinfo, so they never block
+    the loop, and concurrent lookups of the same name share one query. An
+    expired address keeps being used while a background task looks the
+    name up again, so only the first connection to a name waits for DNS.
+    Runs on the RCON event loop.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        """
+        Initialize an AddressResolver object.
+
+        Args:
+            ttl (float): Seconds a resolved address is used before it is
+                refreshed.
+        """
+        self.ttl = ttl
+        # host name -> (address, expiry time)
+        self.cache: dict[str, tuple[str, float]] = {}
+        self.lookups: dict[str, asyncio.Task] = {}
+
+    async def resolve(self, host: str) -> str:
+        """
+        Return the address of a host, an IPv4 or IPv6 literal or a name.
+
+        Raises:
+            RconError: If the name can't be resolved.
+        """
+        address = ip_literal(host)
+        if address is not None:
+            return address
+        host = host.lower()
+        cached = self.cache.get(host)
+        if cached is not None:
+            if time.monotonic() >= cached[1]:
+                self._lookup(host)
+            return cached[0]
+        return await asyncio.shield(self._lookup(host))
+
+    def _lookup(self, host: str) -> asyncio.Task:
+        """Start looking a name up, unless a lookup is already running."""
+        task = self.lookups.get(host)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._query(host))
+            self.lookups[host] = task
+            # Background refreshes have nobody awaiting their errors
+            task.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+        return task
 
-            # print(f"Original Response: {response}")
+    async def _query(self, host: str) -> str:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, None, type=socket.SOCK_STREAM
+            )
+        except (OSError, UnicodeError) as e:
+            raise RconError(f"Could not resolve domain {host}: {e}") from e
+        finally:
+            self.lookups.pop(host, None)
+        # Prefer IPv4, which every Palworld server listens on
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        address = infos[0][4][0]
+        self.cache[host] = (address, time.monotonic() + self.ttl)
+        return address
+
+    def clear(self) -> None:
+        """Forget every cached address."""
+        self.cache.clear()
+
+
+class RconEventLoop:
+    """Background thread running the event loop of the RCON client.
+
+    Blocking code, like the eventlet web server and the monitor, submits
+    coroutines to it and waits on the returned concurrent futures, while
+    asyncio code, like the Discord bot, awaits them with asyncio.wrap_future.
+    """
 
-            # if the response is base64 encoded, decode it
-            if is_base64_encoded(response):
-                response = base64.b64decode(response).decode("utf-8")
-                # print(f"Decoded Response: {response}")
+    def __init__(self):
+        """Initialize a RconEventLoop object. The thread starts on first use."""
+        self.lock = threading.Lock()
+        self.loop: asyncio.AbstractEventLoop = None
+        self.thread: threading.Thread = None
 
-            return resp_type, reqid, response
+    def submit(self, coro) -> Future:
+        """
+        Schedule a coroutine on the RCON event loop from any thread.
+
+        Returns:
+            Future: Resolves to the result of the coroutine.
+        """
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(
+                    target=self.loop.run_forever, name="rcon-loop", daemon=True
+                )
+                self.thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+rcon_loop = RconEventLoop()
+rcon_resolver = AddressResolver()
+rcon_metrics = RconMetrics()
+rcon_pool = RconConnectionPool()
+rcon_scheduler = RconScheduler(rcon_pool)
 
 
 def colorize(s):
@@ -239,7 +1419,8 @@ def start(host_port, password):
         host_port (str): The host and port of the RCON server in the format "host:port".
         password (str): The RCON password for authentication.
     """
-    host, port = host_port.split(":")
+    host, port = host_port.rsplit(":", 1)
+    host = host.strip("[]")
     port = int(port)
 
     try:
@@ -267,19 +1448,28 @@ def start(host_port, password):
         print(f"Failed to connect to RCON server: {e}", file=sys.stderr)
 
 
-def execute(host_port: str, password, *commands, base64_encoded: bool = False):
+def command_name(command: str) -> str:
+    """Return the name a command is recorded under in rcon_metrics."""
+    words = command.split(None, 1)
+    return words[0].lower() if words else "empty"
+
+
+def prometheus_label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prepare_command(command: str, base64_encoded: bool = False) -> str:
     """
-    Execute one or more commands on the RCON server.
+    Escape a command the way the Palworld server expects it.
 
     Args:
-        host_port (str): The host and port of the RCON server in the format "host:port".
-        password (str): The RCON password for authentication.
-        *commands (str): The commands to send to the RCON server.
-    """
-    host, port = host_port.split(":")
-    port = int(port)
-    command = " ".join(commands)
+        command (str): The command and its arguments.
+        base64_encoded (bool): Whether the server expects base64 commands.
 
+    Returns:
+        str: The command to send.
+    """
     # Replace spaces with a non-breaking space (ASCII 160) or unit separator (ASCII 31)
     # Here, we use the unit separator as an example
     if command.lower().startswith("broadcast "):
@@ -303,44 +1493,203 @@ def execute(host_port: str, password, *commands, base64_encoded: bool = False):
 
     if base64_encoded:
         command = base64.b64encode(command.encode("utf-8")).decode("utf-8")
+    return command
+
+
+async def run_commands(
+    host,
+    port,
+    password,
+    commands,
+    base64_encoded=False,
+    timeout=10.0,
+    priority=PRIORITY_ADMIN,
+) -> list:
+    """
+    Execute commands on the RCON server. Runs on the RCON event loop.
 
+    Returns:
+        list: The response of each command, or the error if they failed.
+    """
+    prepared = [
+        prepare_command(command, base64_encoded) for command in commands
+    ]
+    # A server that takes base64 commands always answers in base64, and a
+    # negotiated plain server never does, so only detect it while the
+    # encoding isn't known yet
+    if base64_encoded is None:
+        encoding = ENCODING_AUTO
+    elif base64_encoded:
+        encoding = ENCODING_BASE64
+    else:
+        encoding = ENCODING_PLAIN
+    coalesce = (
+        len(commands) == 1
+        and commands[0].strip().lower() in COALESCED_COMMANDS
+    )
+    names = [command_name(command) for command in commands]
     try:
-        with RemoteConsole(host, port, password) as remote_console:
-            req_id = remote_console.write(command)
-            _, resp_req_id, data = remote_console.read()
-            if req_id != resp_req_id:
-                return "Error: Invalid Password?"
-
-            # print(colorize(data))
-            return data
+        responses = await rcon_scheduler.execute_many(
+            host,
+            port,
+            password,
+            prepared,
+            timeout,
+            encoding,
+            priority,
+            coalesce,
+            names,
+        )
+        return [data for _, _, data in responses]
     except Exception as e:  # pylint: disable=broad-except
-        return f"Failed to execute command: {e}"
+        for name in names:
+            rcon_metrics.record_error(name, e)
+        return [CommandFailure(e)] * len(commands)
+
+
+def submit_commands(
+    host_port: str,
+    password,
+    commands,
+    base64_encoded: bool = False,
+    timeout: float = 10.0,
+    priority: int = PRIORITY_ADMIN,
+) -> Future:
+    """
+    Start executing commands on the RCON server without waiting for them.
+
+    Args:
+        host_port (str): The host and port of the RCON server in the format "host:port".
+        password (str): The RCON password for authentication.
+        commands (list): The commands to send to the RCON server.
+        base64_encoded (bool): Whether the server takes base64 commands,
+            or None to detect base64 responses while that isn't known.
+        timeout (float): Seconds to wait for the responses.
+        priority (int): PRIORITY_ADMIN, PRIORITY_ENFORCEMENT or
+            PRIORITY_MONITORING.
+
+    Returns:
+        Future: Resolves to the response of each command, in order.
+    """
+    host, port = host_port.rsplit(":", 1)
+    return rcon_loop.submit(
+        run_commands(
+            host,
+            int(port),
+            password,
+            commands,
+            base64_encoded,
+            timeout,
+            priority,
+        )
+    )
+
+
+def execute(host_port: str, password, *commands, base64_encoded: bool = False):
+    """
+    Execute one or more commands on the RCON server.
+
+    Args:
+        host_port (str): The host and port of the RCON server in the format "host:port".
+        password (str): The RCON password for authentication.
+        *commands (str): The commands to send to the RCON server.
+    """
+    command = " ".join(commands)
+    future = submit_commands(
+        host_port, password, [command], base64_encoded=base64_encoded
+    )
+    # print(colorize(data))
+    return future.result()[0]
+
+
+def execute_many(
+    host_port: str, password, commands, base64_encoded: bool = False
+) -> list:
+    """
+    Execute several commands on the RCON server in a single round trip.
+
+    Args:
+        host_port (str): The host and port of the RCON server in the format "host:port".
+        password (str): The RCON password for authentication.
+        commands (list): The commands to send to the RCON server.
+
+    Returns:
+        list: The response of each command, in order.
+    """
+    return submit_commands(
+        host_port, password, commands, base64_encoded=base64_encoded
+    ).result()
+
+
+async def execute_async(
+    host_port: str, password, *commands, base64_encoded: bool = False
+) -> str:
+    """
+    Execute a command on the RCON server from any asyncio event loop.
+
+    Args:
+        host_port (str): The host and port of the RCON server in the format "host:port".
+        password (str): The RCON password for authentication.
+        *commands (str): The commands to send to the RCON server.
+    """
+    future = submit_commands(
+        host_port, password, [" ".join(commands)], base64_encoded
+    )
+    return (await asyncio.wrap_future(future))[0]
+
+
+def close_connections(host=None, port=None, password=None) -> None:
+    """Close the pooled connections to one server, or to every server."""
+    if rcon_loop.loop is not None:
+        rcon_loop.loop.call_soon_threadsafe(
+            rcon_pool.close, host, port, password
+        )
+
+
+def ip_literal(host: str):
+    """Return an IPv4 or IPv6 address in its normal form, or None."""
+    try:
+        return str(ipaddress.ip_address(host.strip().strip("[]")))
+    except ValueError:
+        return None
+
+
+def normalize_address(ip_or_domain):
+    """Check that input is an IP address or a domain name, without DNS.
+
+    Args:
+        ip_or_domain (str): The input IP address or domain name.
+
+    Returns:
+        str: The IP address or the lower case domain name, or an error
+            message if it is neither.
+    """
+    address = ip_literal(ip_or_domain or "")
+    if address is not None:
+        return address
+    if re.match(DOMAIN_PATTERN, ip_or_domain or "", re.IGNORECASE):
+        return ip_or_domain.lower()
+    return f"Error: Invalid IP address or domain name: {ip_or_domain}"
 
 
 def resolve_address(ip_or_domain):
     """Determine if input is an IP address, a domain name, or neither, and resolve if necessary.
 
+    Domain names are looked up through the shared resolver cache.
+
     Args:
         ip_or_domain (str): The input IP address or domain name.
 
     Returns:
         str: The IP address if resolution is successful or the original IP if already an IP address.
     """
-    # Check if the input is an IPv4 address
-    if re.match(IPV4_PATTERN, ip_or_domain, re.IGNORECASE):
-        return ip_or_domain  # It's already an IP address, return as is
-
-    # Check if the input is a domain name (including subdomains)
-    elif re.match(DOMAIN_PATTERN, ip_or_domain, re.IGNORECASE):
-        try:
-            ip = socket.gethostbyname(ip_or_domain)
-            return ip
-        except socket.gaierror as exc:
-            return f"Error resolving domain: {exc}"
-
-    # If neither, raise an error
-    else:
-        return f"Error: Invalid IP address or domain name: {ip_or_domain}"
+    address = normalize_address(ip_or_domain)
+    if address.startswith("Error") or ip_literal(address) is not None:
+        return address
+    try:
+        return rcon_loop.submit(rcon_resolver.resolve(address)).result()
+    except RconError as exc:
+        return f"Error resolving domain: {exc}"
 
 
 def parse_cli():
@@ -0,0 +1,149 @@
+"""Registry of the RCON servers of a clustered deployment."""
+
+import threading
+import time
+from typing import Iterator, Optional
+
+from palworld_admin.rcon.parsers import ShowPlayersParser
+
+
+class RconServer:
+    """One Palworld server managed over RCON, next to the local server."""
+
+    def __init__(
+        self,
+        name: str,
+        host: str,
+        port: int,
+        password: str,
+        monitor_interval: float = 5.0,
+    ):
+        """
+        Initialize a RconServer object.
+
+        Args:
+            name (str): The unique name of the server.
+            host (str): The IP address or hostname of the server.
+            port (int): The RCON port of the server.
+            password (str): The RCON password.
+            monitor_interval (float): Seconds between player list polls.
+        """
+        self.name = name
+        self.host = host
+        self.port = int(port)
+        self.password = password
+        self.monitor_interval = monitor_interval
+        # Negotiated by rcon_connect_servers
+        self.base64_encoded = False
+        self.palguard_installed = False
+        self.server_name = ""
+        self.server_version = ""
+        self.connected = False
+        self.message = ""
+        # Monitor state
+        self.next_poll = 0.0
+        self.players: tuple = ()
+        self.showplayers_parser = ShowPlayersParser()
+
+    @property
+    def host_port(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def address(self) -> tuple:
+        """The host and port, which only one registered server may use."""
+        return (self.host.lower(), self.port)
+
+    def to_dict(self) -> dict:
+        """Return the server for the frontend, without its password."""
+        return {
+            "name": self.name,
+            "host": self.host,
+            "port": self.port,
+            "monitor_interval": self.monitor_interval,
+            "base64_encoded": self.base64_encoded,
+            "palguard_installed": self.palguard_installed,
+            "server_name": self.server_name,
+            "server_version": self.server_version,
+            "connected": self.connected,
+            "message": self.message,
+            "player_count": len(self.players),
+        }
+
+
+class RconServerRegistry:
+    """Every registered RCON server, by name.
+
+    Each server gets its own pooled connection and scheduler queue from
+    the RCON client, which key them by host, port and password.
+    """
+
+    def __init__(self):
+        """Initialize a RconServerRegistry object."""
+        self.lock = threading.Lock()
+        self.servers: dict[str, RconServer] = {}
+
+    def __len__(self) -> int:
+        return len(self.servers)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.servers
+
+    def __iter__(self) -> Iterator[RconServer]:
+        with self.lock:
+            return iter(list(self.servers.values()))
+
+    def get(self, name: str) -> Optional[RconServer]:
+        """Return the server with the given name, or None."""
+        return self.servers.get(name)
+
+    def add(self, server: RconServer) -> Optional[RconServer]:
+        """
+        Register a server, replacing any server with the same name.
+
+        Returns:
+            RconServer: The replaced server, or None.
+
+        Raises:
+            ValueError: If a server with another name uses the same host
+                and port.
+        """
+        with self.lock:
+            for other in self.servers.values():
+                if other.address == server.address and (
+                    other.name != server.name
+                ):
+                    raise ValueError(
+                        f"{server.host}:{server.port} is already registered"
+                        f" as {other.name}"
+                    )
+            replaced = self.servers.get(server.name)
+            self.servers[server.name] = server
+            return replaced
+
+    def remove(self, name: str) -> Optional[RconServer]:
+        """Unregister a server and return it, or None if it isn't known."""
+        with self.lock:
+            return self.servers.pop(name, None)
+
+    def due(self, now: float = None) -> list:
+        """
+        Return the connected servers whose player list poll is due.
+
+        Their next poll is scheduled a monitor interval from now.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            due = [
+                server
+                for server in self.servers.values()
+                if server.connected and server.next_poll <= now
+            ]
+            for server in due:
+                server.next_poll = now + server.monitor_interval
+        return due
+
+    def to_list(self) -> list:
+        """Return every server as a dict."""
+        with self.lock:
+            return [server.to_dict() for server in self.servers.values()]
@@ -1,7 +1,6 @@
 """Server Manager module for PalWorld Admin."""
 
 from datetime import datetime
-import filecmp
 import json
 import logging
 import os
@@ -13,7 +12,6 @@ import zipfile
 
 import requests
 
-from palworld_admin.converter.convert import convert_json_to_sav
 from palworld_admin.helper.dbmanagement import save_user_settings_to_db
 from palworld_admin.helper.fileprocessing import file_to_lines, extract_file
 from palworld_admin.helper.networking import (
@@ -1531,109 +1529,22 @@ def backup_server(query: dict) -> dict:
 
 
 def generate_world_option_save(data: dict) -> dict:
-    """Generate WorldOption.sav and return it as a file download."""
-    # Generate WorldOption.sav.json and convert it to WorldOption.sav
+    """Generate WorldOption.sav and write it to the server's save directory."""
     result = {}
-    properties_data = {
-        "Settings": {
-            "struct_type": "PalOptionWorldSettings",
-            "struct_id": "00000000-0000-0000-0000-000000000000",
-            "id": None,
-            "value": {},
-            "type": "StructProperty",
-        }
-    }
-
-    for (
-        key,
-        default_value,
-    ) in app_settings.palworldsettings_defaults.default_values.items():
-        submitted_value = data.get(key, default_value)
-        if str(submitted_value) != str(default_value):
-            if submitted_value.lower() in ["true", "false"]:
-                value = True if submitted_value.lower() == "true" else False
-                _type = "BoolProperty"
-            elif submitted_value.replace(".", "", 1).isdigit():
-                value = (
-                    float(submitted_value)
-                    if "." in submitted_value
-                    else int(submitted_value)
-                )
-                _type = (
-                    "FloatProperty"
-                    if "." in submitted_value
-                    else "IntProperty"
-                )
-            else:
-                # Remove single and double quotes from the submitted value
-                remove = ["'", '"']
-                for char in remove:
-                    submitted_value = submitted_value.replace(char, "")
-                value = submitted_value
-                _type = "StrProperty"
-
-            properties_data["Settings"]["value"][key] = {
-                "id": None,
-                "value": value,
-                "type": _type,
-            }
-
-    json_data = {
-        "header": app_settings.palworldsettings_defaults.worldoptionsav_json_data_header,
-        "properties": {
-            "Version": {"id": None, "value": 100, "type": "IntProperty"},
-            "OptionWorldData": {
-                "struct_type": "PalOptionWorldSaveData",
-                "struct_id": "00000000-0000-0000-0000-000000000000",
-                "id": None,
-                "value": properties_data,
-                "type": "StructProperty",
-            },
-        },
-        "trailer": "AAAAAA==",
-    }
-
-    # Save the JSON data to a file named 'WorldOption.sav.json'
-    with open(
-        os.path.join("./", "WorldOption.sav.json"), "w", encoding="utf-8"
-    ) as json_file:
-        json.dump(json_data, json_file, indent=2)
-
-    # Check if WorldOption.sav exists and delete it
-    if os.path.exists("WorldOption.sav"):
-        os.remove("WorldOption.sav")
-
-    # Run convert.py with the saved file as an argument
-    # subprocess.run(["python3", "convert.py", "WorldOption.sav.json"])
-    convert_json_to_sav("WorldOption.sav.json", "WorldOption.sav")
-
-    # Delete the file from the filesystem
-    os.remove("WorldOption.sav.json")
-
-    # move WoldOption.sav to app_settings.localserver.sav_path directory
-    # replace the existing file if it exists
-    # check if app_settings.localserver.sav_path exists
-    if not os.path.exists(app_settings.localserver.sav_path):
-        os.makedirs(app_settings.localserver.sav_path)
     target_file = os.path.join(
         app_settings.localserver.sav_path, "WorldOption.sav"
     )
-    if os.path.exists(target_file):
-        os.remove(target_file)
-    shutil.copy("WorldOption.sav", target_file)
-
-    # Verify that the file was copied successfully by checking that
-    # the original and copied files are identical
-    if filecmp.cmp("WorldOption.sav", target_file):
+    try:
+        app_settings.world_option_builder.write(
+            data, target_file, strip_quotes=True
+        )
         result["success"] = True
         result["message"] = "WorldOption.sav generated successfully"
-    else:
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error("Error generating WorldOption.sav: %s", e)
         result["success"] = False
         result["message"] = "Error generating WorldOption.sav"
 
-    # Remove original WorldOption.sav file
-    os.remove("WorldOption.sav")
-
     return result
 
 
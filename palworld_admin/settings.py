@@ -10,7 +10,7 @@ import time
 
 from threading import Thread
 
-# from palworld_admin.helper.cli import parse_cli
+from palworld_admin.converter.worldoption import WorldOptionSaveBuilder
 from palworld_admin.classes import (
     PalWorldSettings,
     LocalServer,
@@ -88,7 +88,7 @@ class Settings:
         self.supporter_build: bool = False
         self.supporter_version: str = "0.10.4"
         self.migration_mode: bool = False
-        self.alembic_version: str = "26ad9b14b180"
+        self.alembic_version: str = "b7d3e41c5a92"
         self.exe_path: str = ""
         self.app_os = ""
         self.app_port: int = 8210
@@ -107,6 +107,10 @@ class Settings:
         self.cli_remote: bool = False
 
         self.palworldsettings_defaults = PalWorldSettings()
+        self.world_option_builder = WorldOptionSaveBuilder(
+            self.palworldsettings_defaults.worldoptionsav_json_data_header,
+            self.palworldsettings_defaults.default_values,
+        )
         self.localserver = LocalServer()
         self.memorystorage = MemoryStorage(
             BASE_URL,
@@ -38,14 +38,23 @@ from flask_openid_steam.flask_openid_steam import OpenID
 
 from palworld_admin.rcon import (
     rcon_connect,
-    resolve_address,
+    rcon_disconnect,
+    normalize_address,
     rcon_fetch_players,
     rcon_broadcast,
     rcon_save,
     rcon_ban_player,
     rcon_kick_player,
     rcon_shutdown,
+    rcon_servers,
+    register_server,
+    unregister_server,
+    rcon_connect_servers,
+    rcon_broadcast_servers,
+    rcon_save_servers,
+    rcon_fetch_players_servers,
 )
+from palworld_admin.rcon.rcon import OFFLINE_FAILURES, rcon_metrics
 
 from palworld_admin.servermanager import (
     check_install,
@@ -63,11 +72,14 @@ from palworld_admin.servermanager import (
 from palworld_admin.helper.dbmanagement import (
     get_stored_default_settings,
     commit_players_to_db,
+    commit_command_history_to_db,
     get_players_from_db,
     get_alembic_version,
+    get_connections_from_db,
+    save_connection_to_db,
+    delete_connection_from_db,
 )
 from palworld_admin.settings import app_settings
-from palworld_admin.converter.convert import convert_json_to_sav
 from palworld_admin.classes import (
     db,
     AlembicVersion,
@@ -76,6 +88,7 @@ from palworld_admin.classes import (
     Connection,
     Settings,
     Players,
+    PlayerRegistry,
     DiscordClient,
 )
 
@@ -223,7 +236,9 @@ def flask_app():
     with app.app_context():
         db.create_all()
         initialize_database_defaults()
-        app_settings.localserver.all_players = get_players_from_db()
+        app_settings.localserver.all_players = PlayerRegistry(
+            get_players_from_db()
+        )
         app_settings.localserver.launcher_args = get_stored_default_settings(
             "LauncherSettings"
         )
@@ -234,6 +249,16 @@ def flask_app():
             "Last RCON Connection: %s",
             app_settings.localserver.rcon_last_connection_args,
         )
+        for connection in get_connections_from_db():
+            try:
+                register_server(
+                    connection["name"] or connection["host"],
+                    connection["host"],
+                    connection["port"],
+                    connection["password"],
+                )
+            except ValueError as e:
+                logging.warning("Skipping saved RCON server: %s", e)
         alembic_version = get_alembic_version()
 
     if alembic_version:
@@ -379,6 +404,15 @@ def flask_app():
             result = get_stored_default_settings(data["data"]["model"])
         return jsonify(result)
 
+    @app.route("/metrics")
+    @maybe_requires_auth
+    def metrics():
+        """Serve the RCON client metrics in the Prometheus text format."""
+        return Response(
+            rcon_metrics.to_prometheus(),
+            mimetype="text/plain; version=0.0.4",
+        )
+
     # Route for shutting down the server
     # @app.route("/shutdown", methods=["POST"])
     # def shutdown():
@@ -436,88 +470,9 @@ def flask_app():
     @app.route("/generate_sav", methods=["POST"])
     def generate_sav():
         """Generate WorldOption.sav and return it as a file download."""
-        # Generate WorldOption.sav.json and convert it to WorldOption.sav
-        properties_data = {
-            "Settings": {
-                "struct_type": "PalOptionWorldSettings",
-                "struct_id": "00000000-0000-0000-0000-000000000000",
-                "id": None,
-                "value": {},
-                "type": "StructProperty",
-            }
-        }
-
-        for (
-            key,
-            default_value,
-        ) in app_settings.palworldsettings_defaults.default_values.items():
-            submitted_value = request.form.get(key, default_value)
-            if str(submitted_value) != str(default_value):
-                if submitted_value.lower() in ["true", "false"]:
-                    value = (
-                        True if submitted_value.lower() == "true" else False
-                    )
-                    _type = "BoolProperty"
-                elif submitted_value.replace(".", "", 1).isdigit():
-                    value = (
-                        float(submitted_value)
-                        if "." in submitted_value
-                        else int(submitted_value)
-                    )
-                    _type = (
-                        "FloatProperty"
-                        if "." in submitted_value
-                        else "IntProperty"
-                    )
-                else:
-                    value = submitted_value
-                    _type = "StrProperty"
-
-                properties_data["Settings"]["value"][key] = {
-                    "id": None,
-                    "value": value,
-                    "type": _type,
-                }
-
-        json_data = {
-            "header": app_settings.palworldsettings_defaults.worldoptionsav_json_data_header,
-            "properties": {
-                "Version": {"id": None, "value": 100, "type": "IntProperty"},
-                "OptionWorldData": {
-                    "struct_type": "PalOptionWorldSaveData",
-                    "struct_id": "00000000-0000-0000-0000-000000000000",
-                    "id": None,
-                    "value": properties_data,
-                    "type": "StructProperty",
-                },
-            },
-            "trailer": "AAAAAA==",
-        }
-
-        # Save the JSON data to a file named 'WorldOption.sav.json'
-        with open(
-            os.path.join("./", "WorldOption.sav.json"), "w", encoding="utf-8"
-        ) as json_file:
-            json.dump(json_data, json_file, indent=2)
-
-        # Check if WorldOption.sav exists and delete it
-        if os.path.exists("WorldOption.sav"):
-            os.remove("WorldOption.sav")
-
-        # Run convert.py with the saved file as an argument
-        # subprocess.run(["python3", "convert.py", "WorldOption.sav.json"])
-        convert_json_to_sav("WorldOption.sav.json", "WorldOption.sav")
-
-        # Load WorldOption.sav into memory
-        with open("WorldOption.sav", "rb") as sav_file:
-            sav_data = io.BytesIO(sav_file.read())
-
-        # Delete the file from the filesystem
-        os.remove("WorldOption.sav")
-        os.remove("WorldOption.sav.json")
-
-        # Set the filename for the file-like object
-        sav_data.seek(0)
+        sav_data = io.BytesIO(
+            app_settings.world_option_builder.build(request.form)
+        )
         return send_file(
             sav_data,
             mimetype="application/octet-stream",
@@ -550,34 +505,14 @@ def flask_app():
         # Create a dict from the response
         steam_id = resp.identity_url.split("/")[-1]
         session["steam_id"] = steam_id
-        # Check if the steamID is among the all_players list
-        if steam_id not in [
-            player["steam_id"]
-            for player in app_settings.localserver.all_players
-        ]:
-            new_player = {
-                "steam_id": steam_id,
-                "steam_authenticated": True,
-                "steam_auth_ip": session["client_ip"],
-                "online": False,
-                "name": None,
-                "player_id": None,
-                "save_id": None,
-                "first_login": None,
-                "last_seen": None,
-                "whitelisted": False,
-                "whitelisted_ip": "",
-                "banned": False,
-                "is_admin": False,
-            }
-            # Add the player to the all_players list
-            app_settings.localserver.all_players.append(new_player)
-        else:
-            # Update the player's steam_authenticated status and IP
-            for player in app_settings.localserver.all_players:
-                if player["steam_id"] == steam_id:
-                    player["steam_authenticated"] = True
-                    player["steam_auth_ip"] = session["client_ip"]
+        # Update the player's steam_authenticated status and IP,
+        # adding the player if it isn't known yet
+        app_settings.localserver.all_players.update(
+            steam_id,
+            create=True,
+            steam_authenticated=True,
+            steam_auth_ip=session["client_ip"],
+        )
         logging.info(
             "Player %s authenticated with SteamAuth using %s",
             steam_id,
@@ -706,7 +641,7 @@ def flask_app():
     def connect_rcon(data):
 
         def func(data):
-            host = resolve_address(data.get("host"))
+            host = normalize_address(data.get("host"))
             port = data.get("port")
             password = data.get("password")
             if "Error" in host:
@@ -773,6 +708,12 @@ def flask_app():
     @socketio.on("disconnect_rcon", namespace="/socket")
     def disconnect_rcon():
         def func():
+            if app_settings.localserver.connected:
+                rcon_disconnect(
+                    app_settings.localserver.ip,
+                    app_settings.localserver.port,
+                    app_settings.localserver.password,
+                )
             app_settings.localserver.connected = False
             app_settings.localserver.ip = ""
             app_settings.localserver.port = 0
@@ -835,6 +776,143 @@ def flask_app():
 
         return process_frontend_command(func)
 
+    @socketio.on("rcon_history", namespace="/socket")
+    def rcon_history_socket(data=None):
+        def func(data):
+            data = data or {}
+            reply = {
+                "command": "rcon history",
+                "success": True,
+                "history": app_settings.localserver.command_history.page(
+                    data.get("page", 1),
+                    data.get("per_page", 20),
+                    data.get("source"),
+                ),
+            }
+            return reply
+
+        return process_frontend_command(func, data)
+
+    @socketio.on("rcon_metrics", namespace="/socket")
+    def rcon_metrics_socket():
+        def func():
+            reply = {
+                "command": "rcon metrics",
+                "success": True,
+                "metrics": rcon_metrics.snapshot(),
+            }
+            return reply
+
+        return process_frontend_command(func)
+
+    ############# RCON SERVERS SOCKET EVENTS #############
+
+    def servers_reply(command, message):
+        """Return the reply of a fan-out to the registered servers."""
+        return {
+            "command": command,
+            "success": message["status"] == "success",
+            "consoleMessage": message["message"],
+            "outputMessage": message["message"],
+            "toastMessage": message["message"],
+            "servers": message["servers"],
+        }
+
+    @socketio.on("list_rcon_servers", namespace="/socket")
+    def list_rcon_servers_socket():
+        def func():
+            reply = {
+                "command": "list rcon servers",
+                "success": True,
+                "servers": rcon_servers.to_list(),
+            }
+            return reply
+
+        return process_frontend_command(func)
+
+    @socketio.on("add_rcon_server", namespace="/socket")
+    def add_rcon_server_socket(data):
+        def func(data):
+            host = normalize_address(data.get("host"))
+            port = data.get("port")
+            password = data.get("password")
+            name = data.get("name") or host
+            if "Error" in host:
+                return {"toastMessage": host}
+
+            if not valid_value(port, "port"):
+                return {"toastMessage": "Invalid port number"}
+
+            if not valid_value(password, "password"):
+                return {"toastMessage": "Invalid password"}
+
+            try:
+                register_server(name, host, port, password)
+            except ValueError as e:
+                return {"toastMessage": str(e)}
+
+            with app.app_context():
+                save_connection_to_db(
+                    name,
+                    {"host": host, "port": int(port), "password": password},
+                )
+            message = rcon_connect_servers([name])
+            return servers_reply("add rcon server", message)
+
+        return process_frontend_command(func, data)
+
+    @socketio.on("remove_rcon_server", namespace="/socket")
+    def remove_rcon_server_socket(data):
+        def func(data):
+            server = unregister_server(data.get("name"))
+            if server is None:
+                return {"toastMessage": "Unknown RCON server"}
+
+            with app.app_context():
+                delete_connection_from_db(server.name)
+            message = f"Removed RCON server {server.name}"
+            reply = {
+                "command": "remove rcon server",
+                "success": True,
+                "consoleMessage": message,
+                "outputMessage": message,
+                "toastMessage": message,
+                "servers": rcon_servers.to_list(),
+            }
+            return reply
+
+        return process_frontend_command(func, data)
+
+    @socketio.on("connect_rcon_servers", namespace="/socket")
+    def connect_rcon_servers_socket(data=None):
+        def func(data):
+            data = data or {}
+            message = rcon_connect_servers(data.get("servers"))
+            return servers_reply("connect rcon servers", message)
+
+        return process_frontend_command(func, data)
+
+    @socketio.on("rcon_broadcast_servers", namespace="/socket")
+    def rcon_broadcast_servers_socket(data):
+        def func(data):
+            message = rcon_broadcast_servers(
+                data["message"],
+                data["broadcastOrCommand"],
+                data.get("servers"),
+            )
+            return servers_reply("rcon broadcast servers", message)
+
+        return process_frontend_command(func, data)
+
+    @socketio.on("rcon_save_servers", namespace="/socket")
+    def rcon_save_servers_socket(data=None):
+        def func(data):
+            data = data or {}
+            message = rcon_save_servers(data.get("servers"))
+            return servers_reply("rcon save servers", message)
+
+        return process_frontend_command(func, data)
+
     @socketio.on("rcon_shutdown", namespace="/socket")
     def rcon_shutdown_socket(data):
         def func(data):
@@ -1119,6 +1197,7 @@ def flask_app():
                             channel_id=app_settings.localserver.discord_bot_channel_id,
                             rcon_role_id=app_settings.localserver.discord_bot_rcon_role_id,
                             admin_role_id=app_settings.localserver.discord_bot_admin_role_id,
+                            command_history=app_settings.localserver.command_history,
                         )
 
                         app_settings.discord_bot = discord_bot
@@ -1442,7 +1521,6 @@ def flask_app():
     def server_minitor_task():
         timer = 0
         up_indicator = False
-        rcon_indicator = False
         backup_indicator = False
 
         def rcon_monitor():
@@ -1521,14 +1599,9 @@ def flask_app():
                 app_settings.localserver.rcon_monitoring_connection_error_count += (
                     1
                 )
-                if (
-                    result["message"]
-                    == "Connection Error: [winerror 10061] no connection could be made because the target machine actively refused it"  # pylint: disable=line-too-long
-                    or result["message"]
-                    == "Connection Error: [errno 111] connection refused"  # Linux
-                    or result["message"]
-                    == "Connection Error: [errno 104] connection reset by peer"  # Wine
-                ):
+                # Refused, reset or unreachable, whatever the platform's
+                # wording of the error
+                if result.get("error") in OFFLINE_FAILURES:
                     if error_count > 2:
                         app_settings.localserver.rcon_monitoring_connection_error_count = (
                             0
@@ -1563,6 +1636,15 @@ def flask_app():
 
             return reply
 
+        def rcon_poll_interval(since_change, since_online):
+            """Return the seconds until the next player poll."""
+            localserver = app_settings.localserver
+            if since_change < localserver.rcon_monitoring_active_duration:
+                return localserver.rcon_monitoring_active_interval
+            if since_online >= localserver.rcon_monitoring_idle_after:
+                return localserver.rcon_monitoring_idle_interval
+            return localserver.rcon_monitoring_interval
+
         def start_indicator(indicator):
             socketio.emit(
                 "start_indicator",
@@ -1570,10 +1652,23 @@ def flask_app():
                 namespace="/socket",
             )
 
+        def stop_indicator(indicator):
+            socketio.emit(
+                "stop_indicator",
+                {"indicator": indicator},
+                namespace="/socket",
+            )
+
+        next_rcon_poll = 0
+        last_rcon_connected = False
+        last_players_change = 0
+        last_players_online = 0
+        last_players_update = None
+        last_players_update_sent = 0
+
         while True:
             server_running = app_settings.localserver.running
             rcon_connected = app_settings.localserver.connected
-            rcon_interval = app_settings.localserver.rcon_monitoring_interval
             server_monitor_interval = (
                 app_settings.localserver.server_monitoring_interval
             )
@@ -1608,22 +1703,52 @@ def flask_app():
                     backup_indicator = True
                     start_indicator("IO")
 
-            if rcon_indicator:
-                rcon_indicator = False
-                process_frontend_command(
-                    rcon_monitor,
-                    frontend_event="update_players",
-                    indicator="RCON",
-                )
+            if rcon_connected != last_rcon_connected:
+                last_rcon_connected = rcon_connected
+                # Flash the indicator when the connection comes or goes
+                start_indicator("RCON")
+                stop_indicator("RCON")
+
+            if not rcon_connected:
+                # Poll and send the player list right away on reconnect
+                next_rcon_poll = 0
+                last_players_update = None
 
-            # Fetch the players from the server every rcon_interval seconds if connected
+            # Fetch the players from the server when the next poll is due if connected
             if (
                 rcon_connected
-                and timer % rcon_interval == 0
+                and timer >= next_rcon_poll
                 and app_settings.localserver.shutting_down is False
             ):
-                start_indicator("RCON")
-                rcon_indicator = True
+                reply = process_frontend_command(rcon_monitor)
+                if (
+                    "players_joined" in reply["reply"]
+                    or "players_left" in reply["reply"]
+                ):
+                    last_players_change = timer
+                if app_settings.localserver.rcon_player_count:
+                    last_players_online = timer
+                # Only send the player list when it changed, or as a
+                # periodic refresh for pages that were opened since
+                players_update = hash(
+                    json.dumps(reply, sort_keys=True, default=str)
+                )
+                if (
+                    not reply["reply"].get("success")
+                    or players_update != last_players_update
+                    or timer - last_players_update_sent
+                    >= app_settings.localserver.rcon_monitoring_resend_interval
+                ):
+                    # The indicator only shows traffic to the frontend,
+                    # not every poll
+                    start_indicator("RCON")
+                    send_to_frontend("update_players", reply)
+                    stop_indicator("RCON")
+                    last_players_update = players_update
+                    last_players_update_sent = timer
+                next_rcon_poll = timer + rcon_poll_interval(
+                    timer - last_players_change, timer - last_players_online
+                )
 
             # Check server running every server_monitor_interval seconds
             if up_indicator:
@@ -1639,17 +1764,39 @@ def flask_app():
 
             # Commit players to the database every player_to_db_interval seconds
             if timer % player_to_db_interval == 0:
-                if len(app_settings.localserver.all_players) > 0:
-                    with app.app_context():
-                        commit_players_to_db(
-                            app_settings.localserver.all_players
-                        )
+                with app.app_context():
+                    commit_players_to_db(app_settings.localserver.all_players)
+                    commit_command_history_to_db(
+                        app_settings.localserver.command_history
+                    )
 
             timer += 0.5
             # logging.info("Server Monitor Timer: %s", timer)
             # Use socketio.sleep for proper thread management
             socketio.sleep(0.5)
 
+    def rcon_servers_monitor_task():
+        """Poll the player lists of the registered servers when due."""
+
+        def rcon_servers_monitor(servers):
+            result = rcon_fetch_players_servers(servers)
+            reply = {
+                "command": "rcon servers monitor",
+                "success": result["status"] == "success",
+                "playerCount": result["player_count"],
+                "servers": result["servers"],
+            }
+            return reply
+
+        while True:
+            # Each server is due on its own schedule; the due ones are
+            # polled together, so the poll takes about one round trip
+            due = rcon_servers.due()
+            if due:
+                reply = process_frontend_command(rcon_servers_monitor, due)
+                send_to_frontend("update_servers", reply)
+            socketio.sleep(0.5)
+
     check_install()
     # Start the server from the CLI if the settings are set
     if (
@@ -1680,6 +1827,9 @@ def flask_app():
 
     # Start the server monitor in the background
     socketio.start_background_task(server_minitor_task)
+    socketio.start_background_task(rcon_servers_monitor_task)
+    if len(rcon_servers):
+        socketio.start_background_task(rcon_connect_servers)
 
     # Set socketIO to use the Flask app
     logging.info("Launching application on port %s", app_settings.app_port)